@@ -1,9 +1,205 @@
 from astropy.time import Time
 from astropy.coordinates import SkyCoord, EarthLocation, AltAz
 from astropy import units as u
-from astropy.coordinates import get_sun, get_moon
+from astropy.coordinates import get_sun, get_moon, TETE
 import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+import numpy as np
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Ephemeris functions for the bodies AstronomyTools knows how to track
+BODIES = {
+    'sun': get_sun,
+    'moon': get_moon
+}
+
+# Events found by AstronomyTools.find_events: (body, altitude threshold in
+# degrees, rising). Rise/set use the upper limb with standard refraction.
+EVENTS = {
+    'sunrise': ('sun', -0.833, True),
+    'sunset': ('sun', -0.833, False),
+    'civil_dawn': ('sun', -6, True),
+    'civil_dusk': ('sun', -6, False),
+    'nautical_dawn': ('sun', -12, True),
+    'nautical_dusk': ('sun', -12, False),
+    'astronomical_dawn': ('sun', -18, True),
+    'astronomical_dusk': ('sun', -18, False),
+    'moonrise': ('moon', -0.833, True),
+    'moonset': ('moon', -0.833, False)
+}
+
+
+def geocentric_positions(times, chunk_size=10000):
+    """
+    Compute apparent geocentric Sun/Moon positions for an array of times.
+
+    Positions are cartesian (km) in the true equator and equinox of date, so
+    together with the Greenwich apparent sidereal time they are all that is
+    needed to place the bodies in any observer's sky.
+    """
+    times = Time(times).reshape(-1)
+    positions = {body: np.empty((len(times), 3)) for body in BODIES}
+    positions['gast'] = np.empty(len(times))
+
+    for start in range(0, len(times), chunk_size):
+        chunk = times[start:start + chunk_size]
+        frame = TETE(obstime=chunk)
+        for body, ephemeris in BODIES.items():
+            coords = ephemeris(chunk).transform_to(frame)
+            positions[body][start:start + chunk_size] = coords.cartesian.xyz.to_value(u.km).T
+        positions['gast'][start:start + chunk_size] = chunk.sidereal_time('apparent', 'greenwich').rad
+
+    return positions
+
+
+def site_coordinates(location):
+    """Return geodetic latitude/longitude (deg) and ITRS x, y, z (km) of a location."""
+    xyz = tuple(np.asarray(c.to_value(u.km)) for c in location.geocentric)
+    return np.asarray(location.lat.deg), np.asarray(location.lon.deg), xyz
+
+
+def topocentric_altaz(body_xyz, gast, latitude, longitude, site_xyz):
+    """
+    Convert apparent geocentric positions into topocentric altitude and azimuth.
+
+    body_xyz is an (..., 3) array in km from geocentric_positions, gast the
+    matching Greenwich apparent sidereal time in radians, and the site arguments
+    come from site_coordinates. All inputs broadcast against each other.
+    Returns altitude and azimuth in degrees; refraction is not applied, matching
+    an AltAz frame without pressure.
+    """
+    cos_gast, sin_gast = np.cos(gast), np.sin(gast)
+    site_x, site_y, site_z = site_xyz
+
+    # Rotate the observer from the Earth-fixed frame into the equator of date
+    # and subtract it to get the topocentric vector (Moon parallax is ~1 deg)
+    dx = body_xyz[..., 0] - (site_x * cos_gast - site_y * sin_gast)
+    dy = body_xyz[..., 1] - (site_x * sin_gast + site_y * cos_gast)
+    dz = body_xyz[..., 2] - site_z
+
+    right_ascension = np.arctan2(dy, dx)
+    declination = np.arctan2(dz, np.hypot(dx, dy))
+    hour_angle = gast + np.radians(longitude) - right_ascension
+    lat = np.radians(latitude)
+
+    sin_alt = (np.sin(lat) * np.sin(declination) +
+               np.cos(lat) * np.cos(declination) * np.cos(hour_angle))
+    altitude = np.degrees(np.arcsin(np.clip(sin_alt, -1, 1)))
+    azimuth = np.degrees(np.arctan2(
+        -np.cos(declination) * np.sin(hour_angle),
+        np.sin(declination) * np.cos(lat) - np.cos(declination) * np.sin(lat) * np.cos(hour_angle)
+    )) % 360
+    return altitude, azimuth
+
+
+def _sites_altaz(geocentric, latitude, longitude, site_xyz):
+    """Alt/az of every body for a block of sites; module level so process pools can pickle it."""
+    latitude = latitude[:, np.newaxis]
+    longitude = longitude[:, np.newaxis]
+    site_xyz = tuple(c[:, np.newaxis] for c in site_xyz)
+
+    positions = {}
+    for body in BODIES:
+        altitude, azimuth = topocentric_altaz(geocentric[body], geocentric['gast'],
+                                              latitude, longitude, site_xyz)
+        positions[body] = {'altitude': altitude, 'azimuth': azimuth}
+    return positions
+
+
+class EphemerisTable:
+    """
+    Precomputed geocentric Sun/Moon ephemeris stored in a memory-mapped .npy file.
+
+    Each row holds the UTC Julian date, the apparent geocentric Sun and Moon
+    positions from geocentric_positions and the unwrapped Greenwich apparent
+    sidereal time, sampled on a fixed step. Queries linearly interpolate
+    between the two neighbouring rows, so only those pages are read from disk.
+
+    Accuracy: over a 60 minute step the Moon moves ~0.55 deg, and linear
+    interpolation keeps its direction within ~1e-4 deg of the true path (the
+    chord error is almost purely radial and affects distance, not direction);
+    the Sun and sidereal time are smoother still. Polar motion and diurnal
+    aberration, which the topocentric conversion ignores, add under 1 arcsec.
+    Interpolated altitudes therefore stay within ACCURACY_DEG of the exact
+    astropy path, and azimuths too except within a degree of the zenith where
+    azimuth itself is ill-defined. AstronomyTools.ephemeris_error measures the
+    actual deviation for any set of times.
+    """
+
+    ACCURACY_DEG = 0.01
+    COLUMNS = 8
+    # ACCURACY_DEG assumes steps of at most an hour; sidereal time also turns
+    # ~361 deg a day, so np.unwrap cannot follow it at steps of ~12 hours
+    MAX_STEP_MINUTES = 60
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = np.load(path, mmap_mode='r')
+        if self.rows.ndim != 2 or self.rows.shape[1] != self.COLUMNS or len(self.rows) < 2:
+            raise ValueError(f"{path} is not an ephemeris table")
+        self.start = float(self.rows[0, 0])
+        self.end = float(self.rows[-1, 0])
+        self.step = float(self.rows[1, 0] - self.rows[0, 0])
+
+    @classmethod
+    def build(cls, path, start, days, step_minutes=60):
+        """Precompute a table covering days from start and write it to path."""
+        if not 0 < step_minutes <= cls.MAX_STEP_MINUTES:
+            raise ValueError(f"step_minutes must be above 0 and at most {cls.MAX_STEP_MINUTES}")
+        count = int(np.ceil(days * 1440 / step_minutes)) + 1
+        times = Time(start) + np.arange(count) * step_minutes * u.min
+        positions = geocentric_positions(times)
+
+        rows = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64,
+                                         shape=(count, cls.COLUMNS))
+        rows[:, 0] = times.utc.jd
+        rows[:, 1:4] = positions['sun']
+        rows[:, 4:7] = positions['moon']
+        rows[:, 7] = np.unwrap(positions['gast'])
+        rows.flush()
+        del rows
+
+        return cls(path)
+
+    def covers(self, jd):
+        """Boolean mask of the Julian dates that fall inside the table."""
+        jd = np.asarray(jd)
+        return (jd >= self.start) & (jd <= self.end)
+
+    def interpolate(self, jd):
+        """Interpolate geocentric positions in the same layout as geocentric_positions."""
+        position = (np.asarray(jd, dtype=float) - self.start) / self.step
+        index = np.clip(np.floor(position).astype(int), 0, len(self.rows) - 2)
+        fraction = (position - index)[..., np.newaxis]
+
+        lower = self.rows[index]
+        upper = self.rows[index + 1]
+        values = lower + (upper - lower) * fraction
+        return {
+            'sun': values[..., 1:4],
+            'moon': values[..., 4:7],
+            'gast': values[..., 7]
+        }
+
+
+def build_ephemeris_table(argv=None):
+    """Command line entry point: python astro.py build-ephemeris PATH START DAYS"""
+    parser = argparse.ArgumentParser(prog='astro.py build-ephemeris',
+                                     description='Precompute a Sun/Moon ephemeris table.')
+    parser.add_argument('path', help='Output .npy file')
+    parser.add_argument('start', help='First time in the table, e.g. 2025-01-01')
+    parser.add_argument('days', type=float, help='Number of days to cover')
+    parser.add_argument('--step-minutes', type=float, default=60,
+                        help=f'Sampling step in minutes, at most {EphemerisTable.MAX_STEP_MINUTES} (default: 60)')
+    args = parser.parse_args(argv)
+    if not 0 < args.step_minutes <= EphemerisTable.MAX_STEP_MINUTES:
+        parser.error(f"--step-minutes must be above 0 and at most {EphemerisTable.MAX_STEP_MINUTES}")
+
+    table = EphemerisTable.build(args.path, args.start, args.days, args.step_minutes)
+    print(f"Wrote {len(table.rows)} rows to {args.path} "
+          f"(JD {table.start:.3f} to {table.end:.3f})")
 
 
 class AstronomyTools:
@@ -11,6 +207,7 @@ class AstronomyTools:
         # Default location (can be modified)
         self.location = EarthLocation(lat=40.7128 * u.deg, lon=-74.0060 * u.deg, height=0 * u.m)
         self.time = Time(datetime.utcnow())
+        self.ephemeris = None
 
     def set_location(self, latitude, longitude, height=0):
         """Set observation location."""
@@ -18,6 +215,18 @@ class AstronomyTools:
                                       lon=longitude * u.deg,
                                       height=height * u.m)
 
+    def use_ephemeris_table(self, table):
+        """
+        Answer altitude/azimuth queries from a precomputed EphemerisTable.
+
+        Accepts a table or the path of a file written by EphemerisTable.build.
+        Times outside the table automatically fall back to the exact path.
+        Pass None to always use the exact path again.
+        """
+        if table is not None and not isinstance(table, EphemerisTable):
+            table = EphemerisTable(table)
+        self.ephemeris = table
+
     def get_celestial_positions(self):
         """Get current positions of the Sun and Moon."""
         frame = AltAz(obstime=self.time, location=self.location)
@@ -41,25 +250,155 @@ class AstronomyTools:
             }
         }
 
-    def plot_object_path(self, hours=24):
-        """Plot the path of the Sun and Moon over specified hours."""
-        times = [datetime.utcnow() + timedelta(hours=h) for h in range(hours)]
+    def get_celestial_positions_batch(self, latitudes, longitudes, heights=0, times=None,
+                                      processes=None, shard_size=5000):
+        """
+        Get Sun and Moon positions for many observer sites at once.
+
+        Takes arrays of latitude/longitude (deg) and height (m) plus one or more
+        times (default: self.time) and returns the same structure as
+        get_celestial_positions with (sites x times) arrays. The geocentric
+        Sun/Moon positions are computed once per timestamp (from the ephemeris
+        table when one covers it) and converted for all sites with the NumPy
+        topocentric conversion, within EphemerisTable.ACCURACY_DEG of the exact
+        path. Site lists longer than shard_size are split across a process pool.
+        """
+        times = Time(self.time if times is None else times).reshape(-1)
+        locations = EarthLocation.from_geodetic(lon=np.atleast_1d(longitudes) * u.deg,
+                                                lat=np.atleast_1d(latitudes) * u.deg,
+                                                height=np.atleast_1d(heights) * u.m)
+        latitude, longitude, site_xyz = site_coordinates(locations)
+        latitude, longitude = np.atleast_1d(latitude), np.atleast_1d(longitude)
+        site_xyz = tuple(np.atleast_1d(c) for c in site_xyz)
+        geocentric = self._geocentric(times)
+
+        if len(latitude) <= shard_size or processes == 1:
+            return _sites_altaz(geocentric, latitude, longitude, site_xyz)
+
+        shards = [slice(start, start + shard_size) for start in range(0, len(latitude), shard_size)]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(
+                _sites_altaz,
+                [geocentric] * len(shards),
+                [latitude[shard] for shard in shards],
+                [longitude[shard] for shard in shards],
+                [tuple(c[shard] for c in site_xyz) for shard in shards]
+            ))
+
+        return {
+            body: {key: np.concatenate([result[body][key] for result in results])
+                   for key in ('altitude', 'azimuth')}
+            for body in BODIES
+        }
+
+    def time_grid(self, hours=24, step_minutes=60, start=None):
+        """Build an evenly spaced Time array covering the given number of hours."""
+        start = Time(start if start is not None else datetime.utcnow())
+        count = int(round(hours * 60 / step_minutes))
+        return start + np.arange(count) * step_minutes * u.min
+
+    def sun_moon_altaz(self, times, bodies=('sun', 'moon')):
+        """
+        Get altitude and azimuth of the Sun and Moon for a whole array of times.
+
+        All times are transformed in a single AltAz frame, so minute-resolution
+        grids spanning several days cost one batched transform per body instead
+        of one transform per sample. When an ephemeris table is in use, times it
+        covers are interpolated from the table instead.
+        """
         times = Time(times)
+        if self.ephemeris is None:
+            return self._exact_altaz(times, bodies)
+
+        flat_times = times.reshape(-1)
+        jd = flat_times.utc.jd
+        inside = self.ephemeris.covers(jd)
 
-        sun_alts = []
-        moon_alts = []
+        positions = {body: {'altitude': np.empty(jd.shape), 'azimuth': np.empty(jd.shape)}
+                     for body in bodies}
+        partial_results = []
+        if inside.any():
+            partial_results.append((inside, self._table_altaz(jd[inside], bodies)))
+        if not inside.all():
+            partial_results.append((~inside, self._exact_altaz(flat_times[~inside], bodies)))
+
+        for mask, partial in partial_results:
+            for body, values in partial.items():
+                positions[body]['altitude'][mask] = values['altitude']
+                positions[body]['azimuth'][mask] = values['azimuth']
+
+        for values in positions.values():
+            for key in values:
+                values[key] = values[key].reshape(times.shape)
+        return positions
+
+    def ephemeris_error(self, times):
+        """Maximum absolute altitude/azimuth difference (deg) between the table and exact path."""
+        if self.ephemeris is None:
+            raise ValueError("No ephemeris table in use")
+
+        times = Time(times).reshape(-1)
+        times = times[self.ephemeris.covers(times.utc.jd)]
+        table = self._table_altaz(times.utc.jd, BODIES)
+        exact = self._exact_altaz(times, BODIES)
+
+        errors = {}
+        for body in BODIES:
+            azimuth_error = np.abs(table[body]['azimuth'] - exact[body]['azimuth'])
+            errors[body] = {
+                'altitude': float(np.max(np.abs(table[body]['altitude'] - exact[body]['altitude']), initial=0)),
+                'azimuth': float(np.max(np.minimum(azimuth_error, 360 - azimuth_error), initial=0))
+            }
+        return errors
+
+    def _exact_altaz(self, times, bodies):
+        """Full astropy ephemeris and AltAz transform for each body."""
+        frame = AltAz(obstime=times, location=self.location)
+
+        positions = {}
+        for body in bodies:
+            altaz = BODIES[body](times).transform_to(frame)
+            positions[body] = {
+                'altitude': np.asarray(altaz.alt.deg),
+                'azimuth': np.asarray(altaz.az.deg)
+            }
+        return positions
 
-        for t in times:
-            frame = AltAz(obstime=t, location=self.location)
-            sun_altaz = get_sun(t).transform_to(frame)
-            moon_altaz = get_moon(t).transform_to(frame)
+    def _geocentric(self, times):
+        """Geocentric positions for times, interpolated wherever the ephemeris table covers them."""
+        jd = times.utc.jd
+        if self.ephemeris is None or not self.ephemeris.covers(jd).any():
+            return geocentric_positions(times)
 
-            sun_alts.append(sun_altaz.alt.deg)
-            moon_alts.append(moon_altaz.alt.deg)
+        inside = self.ephemeris.covers(jd)
+        geocentric = self.ephemeris.interpolate(jd)
+        if not inside.all():
+            exact = geocentric_positions(times[~inside])
+            for key in geocentric:
+                geocentric[key][~inside] = exact[key]
+        return geocentric
+
+    def _table_altaz(self, jd, bodies):
+        """Interpolate geocentric positions from the table and convert them for this site."""
+        geocentric = self.ephemeris.interpolate(jd)
+        latitude, longitude, site_xyz = site_coordinates(self.location)
+
+        positions = {}
+        for body in bodies:
+            altitude, azimuth = topocentric_altaz(geocentric[body], geocentric['gast'],
+                                                  latitude, longitude, site_xyz)
+            positions[body] = {'altitude': altitude, 'azimuth': azimuth}
+        return positions
+
+    def plot_object_path(self, hours=24, step_minutes=60):
+        """Plot the path of the Sun and Moon over specified hours."""
+        times = self.time_grid(hours, step_minutes)
+        positions = self.sun_moon_altaz(times)
+        offsets = np.arange(len(times)) * step_minutes / 60
 
         plt.figure(figsize=(12, 6))
-        plt.plot(range(hours), sun_alts, 'r-', label='Sun')
-        plt.plot(range(hours), moon_alts, 'b-', label='Moon')
+        plt.plot(offsets, positions['sun']['altitude'], 'r-', label='Sun')
+        plt.plot(offsets, positions['moon']['altitude'], 'b-', label='Moon')
         plt.xlabel('Hours from now')
         plt.ylabel('Altitude (degrees)')
         plt.title('Sun and Moon Paths')
@@ -67,29 +406,85 @@ class AstronomyTools:
         plt.legend()
         plt.show()
 
-    def calculate_night_duration(self):
-        """Calculate duration of astronomical night (sun below -18 degrees)."""
-        times = [datetime.utcnow() + timedelta(hours=h) for h in range(24)]
-        times = Time(times)
+    def find_events(self, start, end, events=None, step_minutes=20, tolerance_seconds=10):
+        """
+        Find rise/set and twilight events (see EVENTS) between start and end.
 
-        night_start = None
-        night_end = None
+        Altitudes are sampled on a coarse grid to bracket every crossing, then
+        all brackets are refined together by bisection, with one batched
+        ephemeris evaluation per body and iteration. Crossings closer together
+        than step_minutes, such as a Moon grazing the horizon, can be missed.
+        Returns a dict mapping each event name to a sorted Time array.
+        """
+        names = list(EVENTS) if events is None else list(events)
+        start_jd, end_jd = Time(start).utc.jd, Time(end).utc.jd
+        step = step_minutes / 1440
+        grid = start_jd + np.arange(int(np.ceil((end_jd - start_jd) / step)) + 1) * step
+        iterations = max(int(np.ceil(np.log2(step_minutes * 60 / tolerance_seconds))), 0)
 
-        for i, t in enumerate(times):
-            frame = AltAz(obstime=t, location=self.location)
-            sun_altaz = get_sun(t).transform_to(frame)
+        found = {}
+        for body in sorted({EVENTS[name][0] for name in names}):
+            body_events = [name for name in names if EVENTS[name][0] == body]
+            altitudes = self._altitudes(grid, body)
 
-            if sun_altaz.alt.deg < -18:
-                if night_start is None:
-                    night_start = i
-            elif night_start is not None and night_end is None:
-                night_end = i
-                break
+            # Bracket every crossing of each event's threshold in the right direction
+            lower, upper, thresholds, rising, labels = [], [], [], [], []
+            for label, name in enumerate(body_events):
+                _, threshold, is_rising = EVENTS[name]
+                above = altitudes >= threshold
+                crossings = np.flatnonzero(above[1:] != above[:-1])
+                crossings = crossings[above[crossings + 1] == is_rising]
+
+                lower.append(grid[crossings])
+                upper.append(grid[crossings + 1])
+                thresholds.append(np.full(len(crossings), threshold))
+                rising.append(np.full(len(crossings), is_rising))
+                labels.append(np.full(len(crossings), label))
+
+            lower, upper = np.concatenate(lower), np.concatenate(upper)
+            thresholds, rising = np.concatenate(thresholds), np.concatenate(rising)
+            labels = np.concatenate(labels)
 
-        if night_start is not None and night_end is not None:
-            return night_end - night_start
+            # Bisect all brackets at once, keeping the crossing between lower and upper
+            for _ in range(iterations if len(lower) else 0):
+                middle = (lower + upper) / 2
+                below = self._altitudes(middle, body) < thresholds
+                move_lower = below == rising
+                lower = np.where(move_lower, middle, lower)
+                upper = np.where(move_lower, upper, middle)
+
+            event_jd = (lower + upper) / 2
+            for label, name in enumerate(body_events):
+                jd = np.sort(event_jd[(labels == label) & (event_jd >= start_jd) & (event_jd <= end_jd)])
+                found[name] = Time(jd, format='jd', scale='utc')
+
+        return found
+
+    def calculate_night_duration(self):
+        """
+        Calculate duration in hours of astronomical night (sun below -18 degrees).
+
+        Uses the night in progress if it is currently dark, otherwise the next one.
+        """
+        now = Time(datetime.utcnow())
+        events = self.find_events(now - 24 * u.hour, now + 48 * u.hour,
+                                  events=('astronomical_dusk', 'astronomical_dawn'))
+        dusks = events['astronomical_dusk'].jd
+        dawns = events['astronomical_dawn'].jd
+
+        for dusk in dusks:
+            following_dawns = dawns[dawns > dusk]
+            if not following_dawns.size:
+                break
+            if following_dawns[0] > now.jd:
+                return (following_dawns[0] - dusk) * 24
         return 0
 
+    def _altitudes(self, jd, body):
+        """Altitude of one body at UTC Julian dates."""
+        times = Time(jd, format='jd', scale='utc')
+        return self.sun_moon_altaz(times, bodies=(body,))[body]['altitude']
+
 
 def main():
     # Example usage
@@ -108,7 +503,16 @@ def main():
 
     # Calculate night duration
     night_hours = tools.calculate_night_duration()
-    print(f"\nDuration of astronomical night: {night_hours} hours")
+    print(f"\nDuration of astronomical night: {night_hours:.2f} hours")
+
+    # Rise and set times over the next day
+    now = Time(datetime.utcnow())
+    events = tools.find_events(now, now + 24 * u.hour,
+                               events=('sunrise', 'sunset', 'moonrise', 'moonset'))
+    print("\nRise/set times in the next 24 hours (UTC):")
+    for name, times in events.items():
+        formatted = ', '.join(t.strftime('%H:%M') for t in times) or 'none'
+        print(f"{name.capitalize()}: {formatted}")
 
     # Plot paths
     print("\nGenerating plot of Sun and Moon paths...")
@@ -116,4 +520,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == 'build-ephemeris':
+        build_ephemeris_table(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,54 @@
+import random
+import re
+import string
+import sys
+import time
+from collections import Counter
+
+from starting_letter_freq import TextAnalyzer
+
+
+def reference_frequencies(text):
+    """
+    The original list-based implementation, kept here as the baseline
+    """
+    words = [word.strip() for word in re.split(r'\s+', text) if word.strip()]
+    words = [word for word in words if word and word[0].isalpha()]
+    return dict(Counter(word[0].upper() for word in words))
+
+
+def sample_text(n_words=2_000_000, seed=42):
+    """
+    Build a mostly-ASCII text with some accented and non-letter words mixed in
+    """
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice(string.ascii_letters) for _ in range(rng.randint(1, 10)))
+                  for _ in range(5000)]
+    vocabulary += ["élan", "Über", "Ångström", "1897", "(see", "[12]", "“quoted”"]
+    return ' '.join(rng.choice(vocabulary) for _ in range(n_words))
+
+
+def best_time(func, text, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as f:
+            text = f.read()
+    else:
+        text = sample_text()
+
+    print(f"Text size: {len(text) / 1e6:.1f}M characters")
+    reference_time, expected = best_time(reference_frequencies, text)
+    fast_time, analyzer = best_time(TextAnalyzer, text)
+
+    assert analyzer.letter_frequencies == expected, "fast path disagrees with the reference"
+    print(f"Reference implementation: {reference_time:.3f}s")
+    print(f"TextAnalyzer fast path:   {fast_time:.3f}s")
+    print(f"Speedup: {reference_time / fast_time:.1f}x")
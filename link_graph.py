@@ -0,0 +1,184 @@
+import os
+from array import array
+
+import numpy as np
+
+
+class LinkGraph:
+    """
+    Directed graph of article links with titles interned to integer ids.
+
+    Edges are buffered in compact int32 arrays while crawling and merged into
+    CSR form on demand: the targets of node i are
+    indices[indptr[i]:indptr[i + 1]], sorted and without duplicates. That is
+    4 bytes per edge plus 8 per node, so millions of links fit in tens of
+    megabytes. Saved graphs are plain .npy files that load memory-mapped.
+    """
+
+    def __init__(self, titles=(), indptr=None, indices=None):
+        self.titles = list(titles)
+        self.ids = {title: i for i, title in enumerate(self.titles)}
+        self._indptr = np.zeros(len(self.titles) + 1, dtype=np.int64) if indptr is None else indptr
+        self._indices = np.zeros(0, dtype=np.int32) if indices is None else indices
+        self._sources = array('i')
+        self._targets = array('i')
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __contains__(self, title):
+        return title in self.ids
+
+    def intern(self, title):
+        """The id of title, assigning the next free id to new titles"""
+        node = self.ids.get(title)
+        if node is None:
+            node = self.ids[title] = len(self.titles)
+            self.titles.append(title)
+        return node
+
+    def add_links(self, title, targets):
+        """Add an edge from title to every target title"""
+        source = self.intern(title)
+        for target in targets:
+            self._sources.append(source)
+            self._targets.append(self.intern(target))
+
+    def compact(self):
+        """Merge buffered edges into the CSR arrays"""
+        nodes = len(self.titles)
+        if not self._sources and len(self._indptr) == nodes + 1:
+            return
+
+        old_sources = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int64), np.diff(self._indptr))
+        sources = np.concatenate([old_sources, np.frombuffer(self._sources, dtype=np.int32)])
+        targets = np.concatenate([self._indices, np.frombuffer(self._targets, dtype=np.int32)])
+
+        # One sortable key per edge; sorting groups edges by source and
+        # exposes repeated links as equal neighbours
+        keys = np.sort(sources * nodes + targets)
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])] if len(keys) else keys
+        self._indices = (keys % nodes).astype(np.int32)
+        self._indptr = np.zeros(nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // nodes, minlength=nodes), out=self._indptr[1:])
+        self._sources = array('i')
+        self._targets = array('i')
+
+    @property
+    def indptr(self):
+        self.compact()
+        return self._indptr
+
+    @property
+    def indices(self):
+        self.compact()
+        return self._indices
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    def neighbors(self, title):
+        """Titles linked from title, in id order"""
+        node = self.ids.get(title)
+        if node is None:
+            return []
+        indptr = self.indptr
+        return [self.titles[i] for i in self.indices[indptr[node]:indptr[node + 1]]]
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.bincount(self.indices, minlength=len(self.titles))
+
+    def bfs(self, start, max_depth=2):
+        """
+        Breadth-first search from start, following at most max_depth links.
+
+        Returns a dict mapping every reached title to its link distance, in
+        order of distance. Each level is expanded as one array operation over
+        the whole frontier.
+        """
+        indptr, indices = self.indptr, self.indices
+        depth = np.full(len(self.titles), -1, dtype=np.int32)
+        frontier = np.array([self.ids[start]], dtype=np.int64)
+        depth[frontier] = 0
+        reached = [frontier]
+
+        for level in range(1, max_depth + 1):
+            starts = indptr[frontier]
+            counts = indptr[frontier + 1] - starts
+            if not counts.sum():
+                break
+            # Positions of every frontier node's edges, concatenated
+            positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            targets = indices[positions]
+            frontier = np.flatnonzero(np.bincount(targets[depth[targets] < 0], minlength=len(depth)))
+            if not len(frontier):
+                break
+            depth[frontier] = level
+            reached.append(frontier)
+
+        return {self.titles[node]: int(depth[node]) for node in np.concatenate(reached)}
+
+    def pagerank(self, damping=0.85, tolerance=1e-10, max_iterations=100):
+        """
+        PageRank of every node by power iteration over the CSR arrays.
+
+        Rank from pages without links is spread evenly over all pages. Returns
+        an array indexed by node id that sums to 1.
+        """
+        nodes = len(self.titles)
+        if not nodes:
+            return np.zeros(0)
+        indptr, indices = self.indptr, self.indices
+        out_degree = np.diff(indptr)
+        sources = np.repeat(np.arange(nodes, dtype=np.int32), out_degree)
+        dangling = out_degree == 0
+        inverse_degree = np.divide(1.0, out_degree, out=np.zeros(nodes), where=~dangling)
+
+        rank = np.full(nodes, 1.0 / nodes)
+        for _ in range(max_iterations):
+            share = rank * inverse_degree
+            incoming = np.bincount(indices, weights=share[sources], minlength=nodes)
+            updated = (1 - damping) / nodes + damping * (incoming + rank[dangling].sum() / nodes)
+            converged = np.abs(updated - rank).sum() < tolerance
+            rank = updated
+            if converged:
+                break
+        return rank
+
+    def top(self, scores, k=10):
+        """The k titles with the highest scores as (title, score) pairs"""
+        scores = np.asarray(scores)
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k] if k else np.zeros(0, dtype=int)
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(self.titles[i], scores[i].item()) for i in best]
+
+    def save(self, directory):
+        """Write the graph as .npy files in directory"""
+        os.makedirs(directory, exist_ok=True)
+        lengths = np.fromiter((len(title) for title in self.titles), dtype=np.int64, count=len(self.titles))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        text = np.frombuffer(''.join(self.titles).encode('utf-8'), dtype=np.uint8)
+
+        np.save(os.path.join(directory, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(directory, 'indices.npy'), self.indices)
+        np.save(os.path.join(directory, 'title_offsets.npy'), offsets)
+        np.save(os.path.join(directory, 'titles.npy'), text)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a graph written by save, memory-mapping the edge arrays"""
+        mode = 'r' if mmap else None
+        indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode=mode)
+        indices = np.load(os.path.join(directory, 'indices.npy'), mmap_mode=mode)
+        offsets = np.load(os.path.join(directory, 'title_offsets.npy')).tolist()
+        # Offsets count characters, so titles are slices of the decoded text
+        text = np.load(os.path.join(directory, 'titles.npy')).tobytes().decode('utf-8')
+        titles = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        if len(indptr) != len(titles) + 1:
+            raise ValueError(f"{directory} is not a link graph")
+        return cls(titles, indptr, indices)
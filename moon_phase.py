@@ -1,5 +1,18 @@
 from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
 import math
+import numpy as np
+
+# Lunar age (days) at which each phase ends, in cycle order
+PHASE_BOUNDARIES = [1.84566, 5.53699, 9.22831, 12.91963, 16.61096, 20.30228, 23.99361, 27.68493]
+
+# Phase names and symbols, one more than the boundaries since New Moon wraps around
+PHASE_NAMES = ["New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous", "Full Moon",
+               "Waning Gibbous", "Last Quarter", "Waning Crescent", "New Moon"]
+PHASE_SYMBOLS = ["🌑", "🌒", "🌓", "🌔", "🌕", "🌖", "🌗", "🌘", "🌑"]
+
+# Lunar age (days) at which each phase begins; New Moon begins at the last boundary
+PHASE_STARTS = {name: PHASE_BOUNDARIES[i - 1] for i, name in enumerate(PHASE_NAMES) if i > 0}
 
 
 class MoonPhaseCalculator:
@@ -12,46 +25,18 @@ class MoonPhaseCalculator:
 
     def calculate_phase(self, date):
         """Calculate moon phase for given date"""
-        if isinstance(date, str):
-            date = datetime.strptime(date, "%Y-%m-%d")
-
-        # Calculate days since reference new moon
-        days_since = (date - self.new_moon_ref).total_seconds() / 86400
+        date = self._parse_date(date)
 
         # Calculate lunar age (days into lunar cycle)
-        lunar_age = days_since % self.lunar_cycle
+        lunar_age = self._lunar_age(date)
 
         # Calculate phase percentage (0 to 100)
         phase_percent = (lunar_age / self.lunar_cycle) * 100
 
         # Determine moon phase
-        if lunar_age < 1.84566:
-            phase_name = "New Moon"
-            symbol = "🌑"
-        elif lunar_age < 5.53699:
-            phase_name = "Waxing Crescent"
-            symbol = "🌒"
-        elif lunar_age < 9.22831:
-            phase_name = "First Quarter"
-            symbol = "🌓"
-        elif lunar_age < 12.91963:
-            phase_name = "Waxing Gibbous"
-            symbol = "🌔"
-        elif lunar_age < 16.61096:
-            phase_name = "Full Moon"
-            symbol = "🌕"
-        elif lunar_age < 20.30228:
-            phase_name = "Waning Gibbous"
-            symbol = "🌖"
-        elif lunar_age < 23.99361:
-            phase_name = "Last Quarter"
-            symbol = "🌗"
-        elif lunar_age < 27.68493:
-            phase_name = "Waning Crescent"
-            symbol = "🌘"
-        else:
-            phase_name = "New Moon"
-            symbol = "🌑"
+        phase_index = bisect_right(PHASE_BOUNDARIES, lunar_age)
+        phase_name = PHASE_NAMES[phase_index]
+        symbol = PHASE_SYMBOLS[phase_index]
 
         illumination = self.calculate_illumination(lunar_age)
 
@@ -64,6 +49,34 @@ class MoonPhaseCalculator:
             "illumination": round(illumination, 2)
         }
 
+    def calculate_phases(self, dates):
+        """
+        Calculate moon phases for a whole array of dates at once.
+
+        Accepts anything NumPy can turn into datetime64 (datetime64 arrays,
+        lists of datetimes or "YYYY-MM-DD" strings, pandas date ranges) and
+        returns a dict of columnar arrays instead of a list of dicts.
+        """
+        dates = np.asarray(dates, dtype="datetime64[s]")
+
+        # Calculate days since reference new moon and lunar age
+        days_since = (dates - np.datetime64(self.new_moon_ref, "s")) / np.timedelta64(1, "D")
+        lunar_age = np.mod(days_since, self.lunar_cycle)
+        phase_percent = (lunar_age / self.lunar_cycle) * 100
+        illumination = 50 * (1 - np.cos((lunar_age / self.lunar_cycle) * 2 * np.pi))
+
+        # Look up phase names and symbols from the boundary table
+        phase_index = np.searchsorted(PHASE_BOUNDARIES, lunar_age, side="right")
+
+        return {
+            "date": dates.astype("datetime64[D]"),
+            "phase_name": np.array(PHASE_NAMES)[phase_index],
+            "symbol": np.array(PHASE_SYMBOLS)[phase_index],
+            "lunar_age": np.round(lunar_age, 2),
+            "phase_percent": np.round(phase_percent, 2),
+            "illumination": np.round(illumination, 2)
+        }
+
     def calculate_illumination(self, lunar_age):
         """Calculate visible illumination percentage"""
         # Convert lunar age to angle
@@ -74,15 +87,77 @@ class MoonPhaseCalculator:
     def get_next_phase(self, date, target_phase):
         """Find the next occurrence of a specific moon phase"""
         current_date = datetime.strptime(date, "%Y-%m-%d")
-        max_days_to_check = 30  # Maximum days to look ahead
+        if target_phase not in PHASE_STARTS:
+            return None
+
+        phase_info = self.calculate_phase(current_date)
+        if phase_info["phase_name"] == target_phase:
+            return phase_info
+
+        return self.calculate_phase(self.next_phase_time(current_date, target_phase))
+
+    def next_phase_time(self, date, phase):
+        """Exact moment the given phase next begins, at or after date"""
+        if phase not in PHASE_STARTS:
+            raise ValueError(f"Unknown moon phase: {phase}")
+
+        date = self._parse_date(date)
+        days_ahead = (PHASE_STARTS[phase] - self._lunar_age(date)) % self.lunar_cycle
+        return self._into_phase(date + self._days_after(days_ahead), phase)
+
+    def iter_phase_transitions(self, start, end):
+        """
+        Lazily yield every phase transition in [start, end)
+
+        Each transition is a dict with the moment the phase begins, its name and
+        symbol. Only the current position in the cycle is kept, so calendars
+        spanning centuries stream in constant memory.
+        """
+        start = self._parse_date(start)
+        end = self._parse_date(end)
+
+        # Offsets are always taken from start so rounding never accumulates
+        lunar_age = self._lunar_age(start)
+        cycles = 0
+        index = bisect_left(PHASE_BOUNDARIES, lunar_age)
+
+        while True:
+            if index == len(PHASE_BOUNDARIES):
+                index = 0
+                cycles += 1
+
+            moment = start + self._days_after(cycles * self.lunar_cycle + PHASE_BOUNDARIES[index] - lunar_age)
+            moment = self._into_phase(moment, PHASE_NAMES[index + 1])
+            if moment >= end:
+                return
+
+            yield {
+                "time": moment,
+                "phase_name": PHASE_NAMES[index + 1],
+                "symbol": PHASE_SYMBOLS[index + 1]
+            }
+            index += 1
+
+    def _parse_date(self, date):
+        """Accept datetimes or YYYY-MM-DD strings"""
+        if isinstance(date, str):
+            date = datetime.strptime(date, "%Y-%m-%d")
+        return date
 
-        for i in range(max_days_to_check):
-            check_date = current_date + timedelta(days=i)
-            phase_info = self.calculate_phase(check_date)
-            if phase_info["phase_name"] == target_phase:
-                return phase_info
+    def _days_after(self, days):
+        """Timedelta rounded up to the microsecond"""
+        return timedelta(microseconds=math.ceil(days * 86400e6))
 
-        return None
+    def _into_phase(self, moment, phase):
+        """Step a computed boundary forward past float rounding until it lies inside phase"""
+        while PHASE_NAMES[bisect_right(PHASE_BOUNDARIES, self._lunar_age(moment))] != phase:
+            moment += timedelta(microseconds=1)
+        return moment
+
+    def _lunar_age(self, date):
+        """Days into the lunar cycle at date"""
+        days_since = (date - self.new_moon_ref).total_seconds() / 86400
+        return days_since % self.lunar_cycle
 
 
 # Example usage
@@ -102,4 +177,9 @@ if __name__ == "__main__":
     # Find next full moon
     next_full = calculator.get_next_phase(today.strftime("%Y-%m-%d"), "Full Moon")
     if next_full:
-        print(f"\nNext Full Moon: {next_full['date']}")
\ No newline at end of file
+        print(f"\nNext Full Moon: {next_full['date']}")
+
+    # List phase transitions over the next month
+    print("\nUpcoming phase transitions:")
+    for transition in calculator.iter_phase_transitions(today, today + timedelta(days=30)):
+        print(f"{transition['time']:%Y-%m-%d %H:%M} {transition['symbol']} {transition['phase_name']}")
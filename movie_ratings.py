@@ -1,10 +1,17 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
+from rate_limiter import TokenBucket
+
 # OMDb API Key
 OMDB_API_KEY = "YOUR_OMDB_API_KEY"
+OMDB_URL = "http://www.omdbapi.com/"
+
+NO_RATINGS = {"IMDb Rating": "N/A", "Rotten Tomatoes": "N/A", "Metacritic": "N/A"}
 
 
 def get_movies(year, month, debug=True):
@@ -58,41 +65,85 @@ def get_movies(year, month, debug=True):
         return []
 
 
-def fetch_movie_details_from_omdb(title):
+class OMDbClient:
+    """
+    OMDb ratings lookups for enrich_movies' worker threads.
+
+    The client's own session keeps up to pool_size connections to OMDb
+    alive, one per worker, instead of opening a connection per title; a
+    session passed in is used exactly as configured. Lookups from all
+    threads together are paced to requests_per_second. base_url can point at
+    a local fake OMDb server.
+    """
+
+    def __init__(self, api_key=OMDB_API_KEY, base_url=OMDB_URL, requests_per_second=10, timeout=10,
+                 pool_size=10, session=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.limiter = TokenBucket(requests_per_second)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    def fetch_ratings(self, title):
+        """
+        Fetch movie details and ratings from OMDb API.
+        """
+        self.limiter.acquire()
+        try:
+            response = self.session.get(self.base_url, params={'t': title, 'apikey': self.api_key},
+                                        timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get("Response") == "True":
+                return {
+                    "IMDb Rating": data.get("imdbRating", "N/A"),
+                    "Rotten Tomatoes": next(
+                        (rating["Value"] for rating in data.get("Ratings", []) if rating["Source"] == "Rotten Tomatoes"),
+                        "N/A"),
+                    "Metacritic": next(
+                        (rating["Value"] for rating in data.get("Ratings", []) if rating["Source"] == "Metacritic"), "N/A")
+                }
+            return dict(NO_RATINGS)
+        except Exception as e:
+            print(f"Error fetching OMDb data for '{title}': {e}")
+            return dict(NO_RATINGS)
+
+
+def fetch_movie_details_from_omdb(title, client=None):
     """
     Fetch movie details and ratings from OMDb API.
     """
-    url = f"http://www.omdbapi.com/?t={title}&apikey={OMDB_API_KEY}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        if data.get("Response") == "True":
-            return {
-                "IMDb Rating": data.get("imdbRating", "N/A"),
-                "Rotten Tomatoes": next(
-                    (rating["Value"] for rating in data.get("Ratings", []) if rating["Source"] == "Rotten Tomatoes"),
-                    "N/A"),
-                "Metacritic": next(
-                    (rating["Value"] for rating in data.get("Ratings", []) if rating["Source"] == "Metacritic"), "N/A")
-            }
-        return {"IMDb Rating": "N/A", "Rotten Tomatoes": "N/A", "Metacritic": "N/A"}
-    except Exception as e:
-        print(f"Error fetching OMDb data for '{title}': {e}")
-        return {"IMDb Rating": "N/A", "Rotten Tomatoes": "N/A", "Metacritic": "N/A"}
+    return (client or OMDbClient()).fetch_ratings(title)
 
 
-def print_movies_with_ratings(movies):
-    """Print the movie list with ratings."""
+def enrich_movies(movies, max_workers=8, requests_per_second=10, client=None):
+    """
+    Look up the ratings of every movie concurrently.
+
+    At most max_workers lookups run at once, sharing the client's session and
+    rate limit. Returns copies of the movies with their ratings added, in
+    input order.
+    """
+    client = client or OMDbClient(requests_per_second=requests_per_second, pool_size=max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        ratings = pool.map(client.fetch_ratings, [movie['title'] for movie in movies])
+        return [dict(movie, **rating) for movie, rating in zip(movies, ratings)]
+
+
+def print_movies(movies):
+    """Print a movie list that already has ratings."""
     if not movies:
         print("No movies found or unable to fetch data.")
         return
 
     print(f"\nFound {len(movies)} movies:\n")
     for movie in movies:
-        ratings = fetch_movie_details_from_omdb(movie['title'])
-        movie.update(ratings)
         print(f"Number: {movie['number']}")
         print(f"Title: {movie['title']}")
         print(f"Production: {movie['production']}")
@@ -103,6 +154,11 @@ def print_movies_with_ratings(movies):
         print("-" * 50)
 
 
+def print_movies_with_ratings(movies, max_workers=8, requests_per_second=10, client=None):
+    """Print the movie list with ratings."""
+    print_movies(enrich_movies(movies, max_workers, requests_per_second, client) if movies else movies)
+
+
 # Main program
 if __name__ == "__main__":
     # Get the date two months before the current date
@@ -113,4 +169,4 @@ if __name__ == "__main__":
 
     print(f"Fetching movies released in {year}-{month:02d} (2 months ago)...")
     movies = get_movies(year, month, debug=True)
-    print_movies_with_ratings(movies)
\ No newline at end of file
+    print_movies_with_ratings(movies)
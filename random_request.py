@@ -1,12 +1,22 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+import contextlib
+import hashlib
 import json
 import os
+import queue
+import sqlite3
+import sys
+import threading
 from datetime import datetime
-import schedule
 import time
 import logging
 import random
 
+from scheduler import Scheduler
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -18,9 +28,434 @@ logging.basicConfig(
 )
 
 
+def file_sha1(path, chunk_size=1 << 16):
+    """Hex sha1 of a file, read in chunks"""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class ImageCatalog:
+    """
+    SQLite catalog of downloaded images and their metadata.
+
+    blobs holds one row per distinct image content, keyed by sha1, with its
+    path in the content-addressed store; images holds one row per file title
+    pointing at its blob. Author, license, category and date lookups use
+    indexes instead of reading every image's metadata.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha1 TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS images (
+            title TEXT PRIMARY KEY,
+            sha1 TEXT NOT NULL REFERENCES blobs (sha1),
+            description TEXT,
+            author TEXT,
+            license TEXT,
+            category TEXT,
+            source_url TEXT,
+            download_date TEXT
+        );
+        CREATE INDEX IF NOT EXISTS images_sha1 ON images (sha1);
+        CREATE INDEX IF NOT EXISTS images_author ON images (author);
+        CREATE INDEX IF NOT EXISTS images_license ON images (license);
+        CREATE INDEX IF NOT EXISTS images_category ON images (category);
+        CREATE INDEX IF NOT EXISTS images_download_date ON images (download_date);
+        CREATE TABLE IF NOT EXISTS processed (
+            sha1 TEXT PRIMARY KEY REFERENCES blobs (sha1),
+            width INTEGER,
+            height INTEGER,
+            format TEXT,
+            exif TEXT,
+            variants TEXT,
+            error TEXT
+        );
+    """
+
+    FIELDS = ['title', 'sha1', 'description', 'author', 'license', 'category', 'source_url', 'download_date']
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(self.SCHEMA)
+
+    def add(self, metadata, path, size):
+        """
+        Record an image stored at path; metadata has the FIELDS keys.
+
+        Returns False, changing nothing, if the title is already catalogued.
+        """
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO blobs (sha1, path, size) VALUES (?, ?, ?)",
+                                    (metadata['sha1'], path, size))
+            cursor = self.connection.execute(
+                f"INSERT OR IGNORE INTO images ({', '.join(self.FIELDS)}) VALUES ({', '.join('?' * len(self.FIELDS))})",
+                [metadata.get(field) for field in self.FIELDS]
+            )
+        return cursor.rowcount > 0
+
+    def blob_path(self, sha1):
+        """Stored path of the image content with this sha1, or None"""
+        with self._lock:
+            row = self.connection.execute("SELECT path FROM blobs WHERE sha1 = ?", (sha1,)).fetchone()
+        return row[0] if row else None
+
+    def path_for_title(self, title):
+        """Stored path of the image downloaded for a file title, or None"""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT blobs.path FROM images JOIN blobs ON blobs.sha1 = images.sha1 WHERE images.title = ?",
+                (title,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, title):
+        return self.path_for_title(title) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def find(self, author=None, license=None, category=None, since=None, limit=None):
+        """
+        Images matching every given field exactly, newest first.
+
+        since is a download date prefix such as '20250101'; each result is a
+        dict of FIELDS plus the stored path.
+        """
+        conditions, values = [], []
+        for field, value in [('author', author), ('license', license), ('category', category)]:
+            if value is not None:
+                conditions.append(f"images.{field} = ?")
+                values.append(value)
+        if since is not None:
+            conditions.append("images.download_date >= ?")
+            values.append(since)
+
+        query = (f"SELECT {', '.join('images.' + field for field in self.FIELDS)}, blobs.path "
+                 "FROM images JOIN blobs ON blobs.sha1 = images.sha1")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY images.download_date DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            values.append(limit)
+
+        with self._lock:
+            rows = self.connection.execute(query, values).fetchall()
+        return [dict(zip(self.FIELDS + ['path'], row)) for row in rows]
+
+    def record_processing(self, sha1, result):
+        """Store the result of process_image for a blob"""
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO processed (sha1, width, height, format, exif, variants, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha1, result.get('width'), result.get('height'), result.get('format'),
+                 json.dumps(result.get('exif', {}), ensure_ascii=False),
+                 json.dumps(result.get('variants', {})), result.get('error'))
+            )
+
+    def processing(self, sha1):
+        """The stored process_image result for a blob, or None if it was not processed"""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT width, height, format, exif, variants, error FROM processed WHERE sha1 = ?", (sha1,)
+            ).fetchone()
+        if not row:
+            return None
+        width, height, image_format, exif, variants, error = row
+        return {'width': width, 'height': height, 'format': image_format,
+                'exif': json.loads(exif), 'variants': json.loads(variants), 'error': error}
+
+    def close(self):
+        self.connection.close()
+
+
+# Resized variants made by the processing stage: name -> bounding box in pixels
+DEFAULT_VARIANTS = {'thumb': (320, 320), 'gallery': (1280, 1280)}
+
+
+def process_image(save_dir, path, variants):
+    """
+    Decode a stored image and build its resized variants.
+
+    Runs in a worker process. Returns its dimensions, format, EXIF tags and
+    the paths of variants written under variants/<name>/ as JPEG, or an error
+    if the image does not decode. Any other failure (Pillow missing, file
+    missing, disk full) is raised, so the blob is not recorded as processed
+    and is tried again later. Pillow is only needed when images are processed.
+    """
+    from PIL import ExifTags, Image, ImageOps
+
+    sha1 = os.path.basename(path).split('.')[0]
+    filepath = os.path.join(save_dir, path)
+    try:
+        # verify() checks the whole file but leaves the image unusable, so reopen it
+        with Image.open(filepath) as image:
+            image.verify()
+        with Image.open(filepath) as image:
+            image.load()
+            result = {
+                'width': image.width,
+                'height': image.height,
+                'format': image.format,
+                'exif': {str(ExifTags.TAGS.get(tag, tag)): str(value)[:200]
+                         for tag, value in image.getexif().items() if not isinstance(value, bytes)},
+                'variants': {}
+            }
+
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            for name, size in variants.items():
+                variant = os.path.join('variants', name, sha1[:2], f"{sha1}.jpg")
+                variant_path = os.path.join(save_dir, variant)
+                if not os.path.exists(variant_path):
+                    os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+                    resized = image.copy()
+                    resized.thumbnail(size)
+                    temp_path = f"{variant_path}.{os.getpid()}.tmp"
+                    resized.save(temp_path, 'JPEG', quality=85)
+                    os.replace(temp_path, variant_path)
+                result['variants'][name] = variant
+        return result
+    except (Image.DecompressionBombError, SyntaxError, ValueError, OSError) as e:
+        # Pillow reports undecodable data as OSError without an errno; one
+        # with an errno is about the file system, not the image
+        if isinstance(e, OSError) and e.errno is not None:
+            raise
+        return {'error': f"{type(e).__name__}: {str(e)}"}
+
+
+class StageStats:
+    """Items and bytes completed by one pipeline stage, for throughput reports"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.bytes = 0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start timing when the stage's first item starts; later calls do nothing"""
+        with self._lock:
+            if self.started is None:
+                self.started = self.finished = time.monotonic()
+
+    def record(self, size=0):
+        self.start()
+        with self._lock:
+            self.count += 1
+            self.bytes += size
+            self.finished = time.monotonic()
+
+    def __str__(self):
+        elapsed = max(self.finished - self.started, 1e-9) if self.started is not None else 1e-9
+        return (f"{self.name}: {self.count} images in {elapsed:.1f}s "
+                f"({self.count / elapsed:.2f} images/s, {self.bytes / elapsed / 1e6:.2f} MB/s)")
+
+
+class ImagePipeline:
+    """
+    Post-download processing of stored images in a process pool.
+
+    Downloaded blobs go through a bounded queue to a dispatcher thread that
+    keeps at most one task per worker process in flight, so downloads and
+    decoding overlap while a slow CPU stage holds back the downloads instead
+    of letting work pile up in memory. Results go to the catalog's processed
+    table; blobs already processed are skipped. Only results and decode
+    failures are recorded, so blobs that failed for any other reason are
+    processed again on a later run.
+    """
+
+    def __init__(self, save_dir, catalog, variants=None, processes=None, queue_size=32):
+        self.save_dir = save_dir
+        self.catalog = catalog
+        self.variants = DEFAULT_VARIANTS if variants is None else variants
+        self.processes = processes or os.cpu_count() or 1
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = StageStats('process')
+        self._slots = threading.Semaphore(self.processes)
+        self._pool = None
+        self._dispatcher = None
+
+    def __enter__(self):
+        # Fail before any download rather than in every worker
+        try:
+            import PIL  # noqa: F401
+        except ImportError as e:
+            raise ImportError("Processing images needs Pillow") from e
+        self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, path):
+        """Queue a blob (path relative to save_dir), blocking while the queue is full"""
+        self.queue.put(path)
+
+    def _dispatch(self):
+        # Blobs shared by several titles arrive more than once
+        submitted = set()
+        while True:
+            path = self.queue.get()
+            if path is None:
+                return
+            sha1 = os.path.basename(path).split('.')[0]
+            if sha1 in submitted or self.catalog.processing(sha1) is not None:
+                continue
+            submitted.add(sha1)
+            self._slots.acquire()
+            self.stats.start()
+            future = self._pool.submit(process_image, self.save_dir, path, self.variants)
+            future.add_done_callback(lambda future, sha1=sha1, path=path: self._done(sha1, path, future))
+
+    def _done(self, sha1, path, future):
+        self._slots.release()
+        try:
+            result = future.result()
+        except Exception as e:
+            # Not a decode failure, so leave it unrecorded to be retried
+            logging.warning(f"Image {path} could not be processed: {type(e).__name__}: {str(e)}")
+            return
+        if result.get('error'):
+            logging.warning(f"Image {path} failed processing: {result['error']}")
+        self.catalog.record_processing(sha1, result)
+        self.stats.record(os.path.getsize(os.path.join(self.save_dir, path)))
+
+    def close(self):
+        """Wait for every queued image to be processed"""
+        if self._dispatcher:
+            self.queue.put(None)
+            self._dispatcher.join()
+            self._pool.shutdown(wait=True)
+            self._dispatcher = None
+
+
+class CategoryIndex:
+    """
+    Local index of category members for O(1) random sampling.
+
+    Members are numbered 0..count-1 per category in the order they were
+    listed, so drawing a random member is a single primary-key lookup.
+    Listing runs in timestamp order starting from the newest member already
+    indexed, so the first refresh pages through the whole category (resuming
+    where it stopped if interrupted) and later refreshes only fetch members
+    added since. Members removed from a category stay in the index.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS category_members (
+            category TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            PRIMARY KEY (category, idx)
+        ) WITHOUT ROWID;
+        CREATE UNIQUE INDEX IF NOT EXISTS category_members_title ON category_members (category, title);
+        CREATE TABLE IF NOT EXISTS categories (
+            category TEXT PRIMARY KEY,
+            count INTEGER NOT NULL,
+            newest TEXT,
+            refreshed_at REAL
+        );
+    """
+
+    def __init__(self, path, list_members, max_age=24 * 3600):
+        """list_members(category, start) yields pages of (title, timestamp) from timestamp start on"""
+        self.list_members = list_members
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(self.SCHEMA)
+
+    def _state(self, category):
+        row = self.connection.execute("SELECT count, newest, refreshed_at FROM categories WHERE category = ?",
+                                      (category,)).fetchone()
+        return row or (0, None, None)
+
+    def count(self, category):
+        with self._lock:
+            return self._state(category)[0]
+
+    def is_stale(self, category):
+        """True if the category was never fully listed or not within max_age seconds"""
+        with self._lock:
+            refreshed_at = self._state(category)[2]
+        return refreshed_at is None or time.time() - refreshed_at > self.max_age
+
+    def refresh(self, category):
+        """List members added since the newest indexed one; returns how many were new"""
+        with self._lock:
+            newest = self._state(category)[1]
+
+        added = 0
+        for page in self.list_members(category, newest):
+            with self._lock, self.connection:
+                count, newest, _ = self._state(category)
+                for title, timestamp in page:
+                    cursor = self.connection.execute(
+                        "INSERT OR IGNORE INTO category_members (category, idx, title, timestamp) VALUES (?, ?, ?, ?)",
+                        (category, count, title, timestamp)
+                    )
+                    count += cursor.rowcount
+                    added += cursor.rowcount
+                    newest = max(newest or timestamp, timestamp)
+                # Saved per page, so an interrupted listing continues from here
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO categories (category, count, newest, refreshed_at) VALUES (?, ?, ?, NULL)",
+                    (category, count, newest)
+                )
+
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO categories (category, count, newest, refreshed_at) VALUES (?, 0, NULL, ?) "
+                "ON CONFLICT (category) DO UPDATE SET refreshed_at = excluded.refreshed_at",
+                (category, time.time())
+            )
+        return added
+
+    def sample(self, category):
+        """A uniformly random indexed member of category, or None if it has none"""
+        with self._lock:
+            count = self._state(category)[0]
+            if not count:
+                return None
+            row = self.connection.execute("SELECT title FROM category_members WHERE category = ? AND idx = ?",
+                                          (category, random.randrange(count))).fetchone()
+        return row[0]
+
+    def close(self):
+        self.connection.close()
+
+
 class WikimediaImageFetcher:
-    def __init__(self, save_dir='downloaded_images'):
+    # Most titles the API accepts in one imageinfo query
+    MAX_TITLES = 50
+    # Bytes read from the network and written to disk at a time
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, save_dir='downloaded_images', pool_size=16, max_retries=3, backoff=0.5,
+                 refresh_interval=24 * 3600, timeout=(10, 30)):
         self.save_dir = save_dir
+        self.backoff = backoff
+        self.max_retries = max_retries
+        # (connect, read) seconds for every request; a stalled read raises
+        # Timeout, which makes stream_download resume with a Range request
+        self.timeout = timeout
         self.categories = [
             'Featured_pictures_on_Wikimedia_Commons',
             'Quality_images',
@@ -33,132 +468,312 @@ class WikimediaImageFetcher:
         self.headers = {
             'User-Agent': 'WikimediaImageFetcher/1.0 (https://github.com/yourusername/wikimedia-fetcher; your@email.com) Python/3.x requests/2.x',
         }
+        self.session = self._create_session(pool_size, max_retries)
 
         # Create save directory if it doesn't exist
         if not os.path.exists(save_dir):
             os.makedirs(save_dir)
 
-    def get_random_image(self):
-        """Fetch a random image from specified categories"""
-        # Randomly select a category
-        category = random.choice(self.categories)
-
+        # Images are stored once per content under blobs/, described by the catalog
+        self.catalog = ImageCatalog(os.path.join(save_dir, 'catalog.sqlite'))
+        # Category members are listed once and refreshed every refresh_interval seconds
+        self.category_index = CategoryIndex(os.path.join(save_dir, 'catalog.sqlite'),
+                                            self.list_category_members, refresh_interval)
+
+    def _create_session(self, pool_size, max_retries):
+        """
+        Session that keeps up to pool_size connections per host alive.
+
+        Connection errors, 429 and 5xx responses are retried with exponential
+        backoff, honouring Retry-After.
+        """
+        retry = Retry(total=max_retries, backoff_factor=self.backoff,
+                      status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['GET'], respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def list_category_members(self, category, start=None):
+        """
+        Yield pages of (title, timestamp) for the files in a category.
+
+        Members come oldest first, from timestamp start on if given, following
+        cmcontinue until the listing is complete.
+        """
         params = {
             'action': 'query',
             'format': 'json',
             'list': 'categorymembers',
             'cmtitle': f"Category:{category}",
             'cmtype': 'file',
-            'cmlimit': 50,  # Get multiple files to choose from
+            'cmprop': 'title|timestamp',
+            'cmlimit': 'max',
             'cmsort': 'timestamp',
-            'cmdir': 'desc'
+            'cmdir': 'asc'
         }
+        if start:
+            params['cmstart'] = start
 
-        try:
-            # Get list of files in category
-            response = requests.get(self.api_url, params=params, headers=self.headers)
+        while True:
+            response = self.session.get(self.api_url, params=params, timeout=self.timeout)
             response.raise_for_status()
             data = response.json()
 
             if 'query' not in data or 'categorymembers' not in data['query']:
                 raise Exception("Invalid API response structure")
+            yield [(member['title'], member['timestamp']) for member in data['query']['categorymembers']]
 
-            # Get a random file from the results
-            files = data['query']['categorymembers']
-            if not files:
-                raise Exception(f"No files found in category {category}")
+            if 'continue' not in data:
+                return
+            params.update(data['continue'])
 
-            selected_file = random.choice(files)
-            file_title = selected_file['title']
+    def get_image_infos(self, file_titles, categories):
+        """
+        Image information for up to MAX_TITLES files in one request.
 
-            # Get file information
-            file_params = {
-                'action': 'query',
-                'format': 'json',
-                'prop': 'imageinfo',
-                'titles': file_title,
-                'iiprop': 'url|extmetadata|size',
-                'iiurlwidth': 1920  # Limit image size
-            }
+        categories maps each title to the category it was listed from. Returns
+        a dict mapping titles to image info; files without image info are left
+        out.
+        """
+        file_params = {
+            'action': 'query',
+            'format': 'json',
+            'prop': 'imageinfo',
+            'titles': '|'.join(file_titles),
+            'iiprop': 'url|extmetadata|size|sha1',
+            'iiurlwidth': 1920  # Limit image size
+        }
 
-            file_response = requests.get(self.api_url, params=file_params, headers=self.headers)
-            file_response.raise_for_status()
-            file_data = file_response.json()
+        file_response = self.session.get(self.api_url, params=file_params, timeout=self.timeout)
+        file_response.raise_for_status()
+        file_data = file_response.json()
 
-            # Extract image information
-            pages = file_data.get('query', {}).get('pages', {})
-            if not pages:
-                raise Exception("No image information found")
+        # Map normalized titles back to the requested ones
+        query = file_data.get('query', {})
+        requested = {n['to']: n['from'] for n in query.get('normalized', [])}
 
-            page = next(iter(pages.values()))
+        infos = {}
+        for page in query.get('pages', {}).values():
             if 'imageinfo' not in page or not page['imageinfo']:
-                raise Exception("No image info available")
-
-            image_info = page['imageinfo'][0]
+                continue
+            title = requested.get(page['title'], page['title'])
+            infos[title] = self._image_info(title, page['imageinfo'][0], categories.get(title))
+        return infos
+
+    def _image_info(self, file_title, image_info, category):
+        """The record kept for one image"""
+        # Use thumbnailed URL if available, otherwise use original
+        image_url = image_info.get('thumburl', image_info.get('url'))
+        # Size and sha1 describe the original, so they can only verify the
+        # download when no smaller thumbnail was served instead
+        original = image_url == image_info.get('url')
+
+        # Extract metadata
+        metadata = image_info.get('extmetadata', {})
+        description = metadata.get('ImageDescription', {}).get('value', 'No description available')
+        author = metadata.get('Artist', {}).get('value', 'Unknown')
+        license_info = metadata.get('License', {}).get('value', 'Unknown')
+
+        return {
+            'url': image_url,
+            'title': file_title,
+            'description': description,
+            'author': author,
+            'license': license_info,
+            'category': category,
+            'size': image_info.get('size') if original else None,
+            'sha1': image_info.get('sha1') if original else None
+        }
 
-            # Use thumbnailed URL if available, otherwise use original
-            image_url = image_info.get('thumburl', image_info.get('url'))
+    def get_random_image(self, max_draws=20):
+        """Fetch a random image not downloaded yet from specified categories"""
+        # Randomly select a category
+        category = random.choice(self.categories)
 
-            # Extract metadata
-            metadata = image_info.get('extmetadata', {})
-            description = metadata.get('ImageDescription', {}).get('value', 'No description available')
-            author = metadata.get('Artist', {}).get('value', 'Unknown')
-            license_info = metadata.get('License', {}).get('value', 'Unknown')
+        try:
+            # Bring the local member index up to date, then draw from it
+            if self.category_index.is_stale(category):
+                self.category_index.refresh(category)
+            # Draw again for titles already in the catalog, as fetch_many does
+            for _ in range(max_draws):
+                file_title = self.category_index.sample(category)
+                if not file_title or file_title not in self.catalog:
+                    break
+            if not file_title:
+                raise Exception(f"No files found in category {category}")
+            if file_title in self.catalog:
+                raise Exception(f"No new files found in {max_draws} draws from category {category}")
 
-            return {
-                'url': image_url,
-                'title': file_title,
-                'description': description,
-                'author': author,
-                'license': license_info,
-                'category': category
-            }
+            # Get file information
+            image_info = self.get_image_infos([file_title], {file_title: category}).get(file_title)
+            if not image_info:
+                raise Exception("No image info available")
+            return image_info
 
         except Exception as e:
             logging.error(f"Error fetching image: {str(e)}")
             return None
 
     def download_image(self, image_info):
-        """Download the image and save it with metadata"""
+        """
+        Download the image into the store and catalog it.
+
+        Returns its path relative to save_dir, or False on failure. Titles
+        already in the catalog are not downloaded again, and content that is
+        already stored under another title is kept only once: when the API
+        gave the original's sha1, such a title is catalogued against the
+        stored blob without downloading anything.
+        """
         if not image_info:
             return False
 
-        try:
-            # Download image with headers
-            response = requests.get(image_info['url'], headers=self.headers)
-            response.raise_for_status()
+        existing = self.catalog.path_for_title(image_info['title'])
+        if existing and os.path.exists(os.path.join(self.save_dir, existing)):
+            logging.info(f"Already downloaded: {image_info['title']}")
+            return existing
 
-            # Generate filename with timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            file_extension = image_info['url'].split('.')[-1].split('?')[0]  # Handle URLs with parameters
-            filename = f"wikimedia_{timestamp}.{file_extension}"
-            filepath = os.path.join(self.save_dir, filename)
-
-            # Save image
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-
-            # Save metadata
-            metadata_filename = f"{filename}.json"
-            metadata_filepath = os.path.join(self.save_dir, metadata_filename)
-            with open(metadata_filepath, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'title': image_info['title'],
-                    'description': image_info['description'],
-                    'author': image_info['author'],
-                    'license': image_info['license'],
-                    'category': image_info['category'],
-                    'source_url': image_info['url'],
-                    'download_date': timestamp
-                }, f, indent=4, ensure_ascii=False)
+        try:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+
+            sha1 = image_info.get('sha1')
+            filename = self.catalog.blob_path(sha1) if sha1 else None
+            if filename and os.path.exists(os.path.join(self.save_dir, filename)):
+                logging.info(f"Content of {image_info['title']} is already stored as {filename}")
+                size = image_info['size']
+            else:
+                # Stream the image to a partial file named after its URL, so a
+                # later attempt at the same image resumes it
+                partial_path = self._partial_path(image_info['url'])
+                sha1 = self.stream_download(image_info['url'], partial_path,
+                                            image_info.get('size'), image_info.get('sha1'))
+                size = os.path.getsize(partial_path)
+
+                file_extension = image_info['url'].split('.')[-1].split('?')[0]  # Handle URLs with parameters
+                filename = self.store_blob(partial_path, sha1, file_extension)
+
+            self.catalog.add({
+                'title': image_info['title'],
+                'sha1': sha1,
+                'description': image_info['description'],
+                'author': image_info['author'],
+                'license': image_info['license'],
+                'category': image_info['category'],
+                'source_url': image_info['url'],
+                'download_date': timestamp
+            }, filename, size)
 
             logging.info(f"Successfully downloaded image: {filename}")
-            return True
+            return filename
 
         except Exception as e:
             logging.error(f"Error downloading image: {str(e)}")
             return False
 
+    def store_blob(self, path, sha1, extension):
+        """
+        Move the file at path into the content-addressed store.
+
+        Blobs live at blobs/<first two hex digits>/<sha1>.<extension>; if the
+        content is already stored, path is removed instead. Returns the blob's
+        path relative to save_dir.
+        """
+        existing = self.catalog.blob_path(sha1)
+        if existing and os.path.exists(os.path.join(self.save_dir, existing)):
+            os.remove(path)
+            return existing
+
+        blob = os.path.join('blobs', sha1[:2], f"{sha1}.{extension}")
+        os.makedirs(os.path.join(self.save_dir, 'blobs', sha1[:2]), exist_ok=True)
+        os.replace(path, os.path.join(self.save_dir, blob))
+        return blob
+
+    def migrate_sidecars(self):
+        """
+        Import images saved with .json sidecars into the store and catalog.
+
+        Each image is moved into blobs/ and its sidecar removed once it is
+        catalogued. Images whose title is already catalogued are left where
+        they are. Returns the number of images imported.
+        """
+        imported = 0
+        for name in sorted(os.listdir(self.save_dir)):
+            metadata_filepath = os.path.join(self.save_dir, name)
+            filepath = metadata_filepath[:-len('.json')]
+            if not name.endswith('.json') or not os.path.isfile(filepath):
+                continue
+
+            try:
+                with open(metadata_filepath, encoding='utf-8') as f:
+                    metadata = json.load(f)
+                if metadata['title'] in self.catalog:
+                    logging.warning(f"Not migrating {name}: {metadata['title']} is already catalogued")
+                    continue
+
+                metadata['sha1'] = file_sha1(filepath)
+                size = os.path.getsize(filepath)
+                blob = self.store_blob(filepath, metadata['sha1'], filepath.rsplit('.', 1)[-1])
+                self.catalog.add(metadata, blob, size)
+                os.remove(metadata_filepath)
+                imported += 1
+            except (OSError, ValueError, KeyError) as e:
+                logging.error(f"Error migrating {name}: {str(e)}")
+
+        logging.info(f"Migrated {imported} images into the catalog")
+        return imported
+
+    def _partial_path(self, url):
+        """Where an unfinished download of url is kept between attempts"""
+        return os.path.join(self.save_dir, f".{hashlib.sha1(url.encode('utf-8')).hexdigest()}.part")
+
+    def stream_download(self, url, partial_path, expected_size=None, expected_sha1=None):
+        """
+        Download url into partial_path in CHUNK_SIZE pieces and return its sha1.
+
+        Bytes already in partial_path are kept and the rest requested with a
+        Range header; a transfer that breaks off is resumed the same way, up to
+        max_retries times. The result is checked against expected_size and
+        expected_sha1 (or the server's Content-Length) and the partial file is
+        removed if it does not match. Memory use does not depend on file size.
+        """
+        for attempt in range(self.max_retries + 1):
+            offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 416 and offset:
+                        # Nothing left to fetch: the partial file is complete
+                        break
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        offset = 0
+                    length = response.headers.get('Content-Length')
+                    if expected_size is None and length is not None:
+                        expected_size = offset + int(length)
+
+                    with open(partial_path, 'ab' if offset else 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                            f.write(chunk)
+                break
+            except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"Download of {url} interrupted, resuming")
+                time.sleep(self.backoff * 2 ** attempt)
+
+        size = os.path.getsize(partial_path)
+        sha1 = file_sha1(partial_path, self.CHUNK_SIZE)
+
+        if (expected_size is not None and size != expected_size) or \
+                (expected_sha1 is not None and sha1 != expected_sha1):
+            os.remove(partial_path)
+            raise Exception(f"Downloaded {url} does not match its expected size or sha1")
+        return sha1
+
     def fetch_daily_image(self):
         """Main function to fetch and download a daily image"""
         logging.info("Starting daily image fetch")
@@ -174,26 +789,102 @@ class WikimediaImageFetcher:
 
             logging.warning(f"Attempt {attempt + 1} of {max_attempts} failed")
             if attempt < max_attempts - 1:
-                time.sleep(5)  # Wait 5 seconds before retry
+                # Exponential backoff with jitter before the next attempt
+                time.sleep(self.backoff * 2 ** (attempt + 1) * random.uniform(1, 2))
 
         logging.error("Failed to fetch daily image after all attempts")
 
+    def fetch_many(self, n, concurrency=8, process=False, variants=None, processes=None, queue_size=32):
+        """
+        Download n distinct random images using up to concurrency workers.
+
+        Stale categories are refreshed concurrently, n files not downloaded
+        yet are drawn from the category index (a random category, then a
+        random member, as in get_random_image), and image info is requested
+        MAX_TITLES files per query. Downloads start as soon as their batch of
+        image info arrives, so listing, metadata and downloads overlap on one
+        bounded pool sharing the session's connections.
+
+        With process, every downloaded image is also decoded and resized into
+        variants (see ImagePipeline) by processes worker processes while the
+        downloads continue. Returns the filenames saved.
+        """
+        logging.info(f"Starting bulk fetch of {n} images")
+        saved = []
+        download_stats = StageStats('download')
+        pipeline = ImagePipeline(self.save_dir, self.catalog, variants, processes, queue_size) if process else None
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool, pipeline or contextlib.nullcontext():
+            # Refresh every stale category at once
+            refreshes = {pool.submit(self.category_index.refresh, category): category
+                         for category in self.categories if self.category_index.is_stale(category)}
+            for future in as_completed(refreshes):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"Error listing category {refreshes[future]}: {str(e)}")
+
+            # Sample locally; only files that are not downloaded yet
+            available = [category for category in self.categories if self.category_index.count(category)]
+            categories = {}
+            for _ in range(20 * n if available else 0):
+                if len(categories) == n:
+                    break
+                category = random.choice(available)
+                title = self.category_index.sample(category)
+                if title not in categories and title not in self.catalog:
+                    categories[title] = category
+            chosen = list(categories)
+            if len(chosen) < n:
+                logging.warning(f"Only {len(chosen)} files available for {n} requested images")
+
+            # Metadata batches, each feeding its downloads back into the pool
+            pending = {pool.submit(self.get_image_infos, chosen[start:start + self.MAX_TITLES], categories)
+                       for start in range(0, len(chosen), self.MAX_TITLES)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.error(f"Error fetching image info: {str(e)}")
+                        continue
+                    if isinstance(result, dict):
+                        # Time downloads from the first one, not from the category refresh
+                        download_stats.start()
+                        pending.update(pool.submit(self.download_image, info) for info in result.values())
+                    elif result:
+                        saved.append(result)
+                        download_stats.record(os.path.getsize(os.path.join(self.save_dir, result)))
+                        if pipeline:
+                            pipeline.submit(result)
+
+        logging.info(f"Bulk fetch completed: {len(saved)} of {n} images downloaded")
+        logging.info(str(download_stats))
+        if pipeline:
+            logging.info(str(pipeline.stats))
+        return saved
+
 
 def main():
     # Create fetcher instance
     fetcher = WikimediaImageFetcher()
 
-    # Schedule the job to run daily at midnight
-    schedule.every().day.at("00:00").do(fetcher.fetch_daily_image)
-
-    # Run once immediately
-    fetcher.fetch_daily_image()
+    # Schedule the job to run daily at midnight, once immediately, and again
+    # on startup whenever a midnight run was missed while the script was down
+    scheduler = Scheduler(state_path=os.path.join(fetcher.save_dir, 'schedule_state.json'), max_workers=1)
+    scheduler.daily("00:00", fetcher.fetch_daily_image, name='fetch_daily_image', run_now=True)
 
-    # Keep the script running
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    # Keep the script running, sleeping until the next run is due
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Import images saved before the catalog: python random_request.py migrate [SAVE_DIR]
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        WikimediaImageFetcher(*sys.argv[2:3]).migrate_sidecars()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,211 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# What to do when a job comes due while its previous run is still going
+SKIP = 'skip'    # drop this run
+QUEUE = 'queue'  # run once more as soon as the previous run finishes
+ALLOW = 'allow'  # start another run alongside it
+OVERLAP_POLICIES = (SKIP, QUEUE, ALLOW)
+
+# Longest the scheduler sleeps without checking the clock, in seconds
+MAX_WAIT = 3600
+
+
+class Job:
+    """
+    A function run every interval seconds or daily at a local time.
+
+    Runs start up to jitter seconds after they are due; the schedule itself
+    is kept on the nominal times, so jitter never accumulates.
+    """
+
+    def __init__(self, name, func, interval=None, at=None, overlap=SKIP, jitter=0, catch_up=True):
+        if (interval is None) == (at is None):
+            raise ValueError("Give exactly one of interval or at")
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"overlap must be one of {', '.join(OVERLAP_POLICIES)}")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.at = datetime.strptime(at, '%H:%M').time() if at is not None else None
+        self.overlap = overlap
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.running = 0
+        self.queued = False
+
+    def next_run(self, after):
+        """The first nominal run time strictly after the epoch time after"""
+        if self.interval is not None:
+            return after + self.interval
+        moment = datetime.fromtimestamp(after)
+        run = datetime.combine(moment.date(), self.at)
+        if run <= moment:
+            run = datetime.combine(moment.date() + timedelta(days=1), self.at)
+        return run.timestamp()
+
+    def next_run_after(self, due, now):
+        """The first nominal run after due that is still ahead at now, skipping missed runs"""
+        run = self.next_run(due)
+        if run > now:
+            return run
+        if self.interval is not None:
+            # Keep the original phase rather than restarting from now
+            return due + self.interval * ((now - due) // self.interval + 1)
+        return self.next_run(now)
+
+
+class Scheduler:
+    """
+    Runs jobs at their deadlines without polling.
+
+    Next run times are kept in a heap and the scheduler sleeps until the
+    earliest one (or until a job is added), then hands due jobs to a bounded
+    thread pool so slow jobs never delay the others. The last completed run
+    of every job is saved to state_path; after a restart, a job that missed
+    its deadline meanwhile runs once straight away when catch_up is set.
+
+    clock and wait are injectable, so run_pending can be driven by a fake
+    clock without threads or real sleeps.
+    """
+
+    def __init__(self, state_path=None, max_workers=4, clock=time.time, wait=None):
+        self.state_path = state_path
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._wait = wait or self._wakeup.wait
+        self._stopped = False
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable scheduler state {self.state_path}: {str(e)}")
+            return {}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=4)
+        os.replace(temp_path, self.state_path)
+
+    def add(self, job, run_now=False):
+        """
+        Schedule a job and return it.
+
+        The first run is now with run_now, now too if catch_up is set and a
+        run was missed since the last one recorded in the state, and otherwise
+        at the job's next run time.
+        """
+        now = self.clock()
+        last_run = self.state.get(job.name)
+        if run_now or (job.catch_up and last_run is not None and job.next_run(last_run) <= now):
+            due = now
+        else:
+            due = job.next_run(now)
+
+        with self._lock:
+            self.jobs[job.name] = job
+            self._push(due, job)
+        self._wakeup.set()
+        return job
+
+    def every(self, seconds, func, name=None, **options):
+        """Run func every seconds; options are those of Job and add"""
+        run_now = options.pop('run_now', False)
+        return self.add(Job(name or func.__name__, func, interval=seconds, **options), run_now)
+
+    def daily(self, at, func, name=None, **options):
+        """Run func every day at local time at ('HH:MM'); options are those of Job and add"""
+        run_now = options.pop('run_now', False)
+        return self.add(Job(name or func.__name__, func, at=at, **options), run_now)
+
+    def _push(self, due, job):
+        """Queue a run nominally due at due, starting up to job.jitter seconds later"""
+        start = due + random.uniform(0, job.jitter) if job.jitter else due
+        heapq.heappush(self._heap, (start, next(self._counter), due, job))
+
+    def run_pending(self):
+        """Start every job that is due and return the seconds until the next deadline"""
+        while True:
+            with self._lock:
+                if not self._heap:
+                    return None
+                now = self.clock()
+                start, _, due, job = self._heap[0]
+                if start > now:
+                    return start - now
+                heapq.heappop(self._heap)
+                # From the nominal due time, so a jittered start doesn't shift the schedule
+                self._push(job.next_run_after(due, now), job)
+                start = self._claim(job)
+            if start:
+                self._start(job, due)
+
+    def _claim(self, job):
+        """Apply the overlap policy; True if a run should start now"""
+        if job.running and job.overlap == SKIP:
+            logging.warning(f"Skipping {job.name}: previous run still in progress")
+            return False
+        if job.running and job.overlap == QUEUE:
+            job.queued = True
+            return False
+        job.running += 1
+        return True
+
+    def _start(self, job, due):
+        self.executor.submit(self._run, job, due)
+
+    def _run(self, job, due):
+        try:
+            job.func()
+        except Exception as e:
+            logging.error(f"Job {job.name} failed: {str(e)}")
+        else:
+            with self._lock:
+                self.state[job.name] = due
+                self._save_state()
+        finally:
+            with self._lock:
+                job.running -= 1
+                rerun = job.queued
+                if rerun:
+                    job.queued = False
+                    job.running += 1
+            if rerun:
+                self._start(job, self.clock())
+
+    def run_forever(self):
+        """Run jobs until stop() is called, sleeping between deadlines"""
+        while not self._stopped:
+            self._wakeup.clear()
+            delay = self.run_pending()
+            if not self._stopped:
+                # Deadlines are wall-clock times but waits are not, so wake up
+                # now and then to notice clock changes and system sleep
+                self._wait(MAX_WAIT if delay is None else min(delay, MAX_WAIT))
+
+    def stop(self, wait=True):
+        """Stop run_forever and shut the pool down, by default after running jobs finish"""
+        self._stopped = True
+        self._wakeup.set()
+        self.executor.shutdown(wait=wait)
@@ -1,9 +1,9 @@
 import os
 import subprocess
-import schedule
-import time
 from datetime import datetime
 
+from scheduler import Scheduler
+
 
 def take_safari_screenshot():
     # Generate the filename with the current date
@@ -29,13 +29,14 @@ def take_safari_screenshot():
     print(f"Safari screenshot saved as {filename}")
 
 
-# Schedule the task for 11:11 AM every day
-schedule.every().day.at("11:11").do(take_safari_screenshot)
+# Schedule the task for 11:11 AM every day; a screenshot missed while the
+# script was not running is taken when it starts again
+scheduler = Scheduler(state_path="safari_screenshot_schedule.json", max_workers=1)
+scheduler.daily("11:11", take_safari_screenshot)
 
 print("Safari screenshot scheduler is running. Press Ctrl+C to stop.")
 try:
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    scheduler.run_forever()
 except KeyboardInterrupt:
+    scheduler.stop()
     print("\nScheduler stopped.")
@@ -1,114 +1,423 @@
-import wikipedia
+import requests
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import time
 import json
-from bs4 import BeautifulSoup, GuessedAtParserWarning
-import warnings
+import os
+import re
 
-# Suppress the BeautifulSoup warning
-warnings.filterwarnings("ignore", category=GuessedAtParserWarning)
+from link_graph import LinkGraph
+from rate_limiter import TokenBucket
 
+API_URL = 'https://en.wikipedia.org/w/api.php'
+USER_AGENT = 'explore_libraries search_links (https://github.com/azeus/explore_libraries)'
 
-def explore_wiki_network(main_topic):
+# Links whose titles contain any of these are never explored
+SKIP_LINKS = ['list of', 'index of', 'template:']
+
+
+class ArticleSkipped(Exception):
+    """Raised for titles that resolve to no usable article (missing or disambiguation)"""
+
+
+class WikiClient:
     """
-    Comprehensively explores Wikipedia articles related to a main topic
+    Minimal MediaWiki API client for the crawler.
+
+    Every HTTP request, including retries and continuation pages, takes a
+    token from one shared TokenBucket, so any number of worker threads
+    together stay within requests_per_second. Each request has a timeout and
+    failed requests are retried with exponential backoff.
     """
-    results = defaultdict(list)
-    explored = set()
 
-    def safe_wiki_request(func, arg, max_retries=3):
-        """Generic safe Wikipedia request with retry mechanism"""
-        for attempt in range(max_retries):
+    # Most titles the API accepts in one query
+    MAX_TITLES = 50
+
+    def __init__(self, api_url=API_URL, requests_per_second=5, timeout=10, max_retries=3, session=None):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiter = TokenBucket(requests_per_second)
+        self.session = session or requests.Session()
+        self.session.headers.setdefault('User-Agent', USER_AGENT)
+
+    def get(self, params):
+        """Rate-limited GET of the API with retries"""
+        for attempt in range(self.max_retries):
+            self.limiter.acquire()
             try:
-                time.sleep(1)  # Rate limiting
-                result = func(arg)
-                # Handle case where result is a list (disambiguation)
-                if isinstance(result, list):
-                    return None
-                return result
-            except wikipedia.DisambiguationError as e:
-                print(f"Disambiguation found for '{arg}', skipping...")
-                return None
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    print(f"Error with '{arg}': {str(e)}")
-                    return None
-                time.sleep(2)
-        return None
+                response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except (requests.RequestException, ValueError):
+                if attempt == self.max_retries - 1:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
 
-    def explore_article(title):
-        """Explores a single article and its related links"""
-        if title in explored:
-            return None
+    def query(self, params):
+        """
+        Run a query, following continuation until complete.
 
-        print(f"\nExploring: {title}")
-        explored.add(title)
+        Returns (pages by title, title redirects) where list properties such as
+        categories and links are concatenated across continuation responses and
+        redirects maps each normalized or redirected title to its target.
+        """
+        params = dict(params, action='query', format='json', formatversion=2)
+        pages = {}
+        redirects = {}
+        continuation = {}
+
+        while True:
+            data = self.get(dict(params, **continuation))
+            if 'error' in data:
+                raise RuntimeError(data['error'].get('info', 'API error'))
+
+            query = data.get('query', {})
+            for redirect in query.get('normalized', []) + query.get('redirects', []):
+                redirects[redirect['from']] = redirect['to']
+            for page in query.get('pages', []):
+                merged = pages.setdefault(page['title'], {})
+                for key, value in page.items():
+                    if isinstance(value, list):
+                        merged.setdefault(key, []).extend(value)
+                    elif key not in merged:
+                        merged[key] = value
+
+            if 'continue' not in data:
+                return pages, redirects
+            continuation = data['continue']
+
+    def fetch_article(self, title, with_links=False):
+        """
+        Fetch a single article; see fetch_articles.
+
+        Raises ArticleSkipped for missing pages and disambiguation pages.
+        """
+        article = self.fetch_articles([title], with_links=with_links)[title]
+        if isinstance(article, ArticleSkipped):
+            raise article
+        return article
+
+    def fetch_articles(self, titles, with_links=False):
+        """
+        Fetch title, summary, URL, categories and optionally links for many titles.
+
+        Titles are requested MAX_TITLES at a time in one multi-title query per
+        batch (plus continuation pages), instead of several requests per
+        article. Returns a dict mapping each requested title to its article, or
+        to an ArticleSkipped error for missing pages and disambiguation pages.
+        """
+        props = ['info', 'pageprops', 'extracts', 'categories']
+        if with_links:
+            props.append('links')
+
+        articles = {}
+        for start in range(0, len(titles), self.MAX_TITLES):
+            batch = titles[start:start + self.MAX_TITLES]
+            pages, redirects = self.query({
+                'titles': '|'.join(batch),
+                'prop': '|'.join(props),
+                'redirects': 1,
+                'inprop': 'url',
+                'ppprop': 'disambiguation',
+                'exintro': 1,
+                'explaintext': 1,
+                'exlimit': 'max',
+                'cllimit': 'max',
+                'plnamespace': 0,
+                'pllimit': 'max'
+            })
+            for title in batch:
+                articles[title] = self._article(title, pages, redirects)
+        return articles
+
+    def _article(self, title, pages, redirects):
+        """Build the article for a requested title from merged query results"""
+        resolved = title
+        while resolved in redirects and redirects[resolved] != resolved:
+            resolved = redirects[resolved]
+        page = pages.get(resolved)
+
+        if page is None or page.get('missing') or page.get('invalid'):
+            return ArticleSkipped(f'Page id "{title}" does not match any pages. Try another id!')
+        if 'disambiguation' in page.get('pageprops', {}):
+            return ArticleSkipped(f'"{title}" may refer to several articles')
+
+        return {
+            'title': page['title'],
+            'url': page.get('fullurl', ''),
+            'summary': page.get('extract', ''),
+            'categories': [re.sub(r'^Category:', '', c['title']) for c in page.get('categories', [])],
+            'links': [link['title'] for link in page.get('links', [])]
+        }
+
+
+def main_category(main_topic, categories):
+    """First category mentioning the main topic, or General"""
+    for cat in categories:
+        if main_topic.lower() in cat.lower():
+            return cat.replace("Category:", "").strip()
+    return "General"
+
+
+def article_info(article):
+    """The record stored in the results for one article"""
+    return {
+        "title": article['title'],
+        "url": article['url'],
+        "summary": article['summary'][:200] + "..." if article['summary'] else "No summary available",
+        "categories": article['categories'][:5] if article['categories'] else []
+    }
+
+
+class CrawlCheckpoint:
+    """
+    Persistent crawl state in a directory, so an interrupted crawl resumes exactly.
+
+    results.jsonl gets one line per finished title (its article record or why
+    it was skipped), appended and flushed as the crawl goes. state.json holds
+    the main topic, the selected links and the remaining frontier, and is
+    replaced atomically at every checkpoint. Titles already in results.jsonl
+    are never requested again; titles whose request failed are retried.
+    """
+
+    def __init__(self, directory, checkpoint_every=10):
+        self.directory = directory
+        self.checkpoint_every = checkpoint_every
+        self.state_path = os.path.join(directory, 'state.json')
+        self.results_path = os.path.join(directory, 'results.jsonl')
+        self._results_file = None
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        """Return (state, records) of a previous run, or (None, []) if there is none"""
+        if not os.path.exists(self.state_path):
+            return None, []
+        with open(self.state_path, encoding='utf-8') as f:
+            state = json.load(f)
+
+        records = []
+        if os.path.exists(self.results_path):
+            # Drop a last line that was only partly written when the crawl died
+            with open(self.results_path, 'rb+') as f:
+                data = f.read()
+                complete = data.rfind(b'\n') + 1
+                if complete < len(data):
+                    f.truncate(complete)
+            records = [json.loads(line) for line in data[:complete].decode('utf-8').splitlines() if line]
+        return state, records
 
-        # Get page content
+    def save_state(self, state):
+        """Atomically replace state.json and make appended results durable"""
+        if self._results_file:
+            self._results_file.flush()
+            os.fsync(self._results_file.fileno())
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.state_path)
+
+    def append(self, record):
+        """Append one finished title to results.jsonl"""
+        if self._results_file is None:
+            self._results_file = open(self.results_path, 'a', encoding='utf-8')
+        self._results_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._results_file.flush()
+
+    def close(self):
+        if self._results_file:
+            self._results_file.close()
+            self._results_file = None
+
+
+class WikiCrawler:
+    """
+    Explores Wikipedia articles related to a main topic with a pool of workers.
+
+    The main article is fetched first; its links that mention the topic are
+    then fetched in multi-title batches, concurrently by max_workers threads
+    sharing the client's rate limit. With depth > 1 the links of each level
+    select the next one, breadth first, until max_articles are chosen.
+    Results are assembled in link order, so they match a sequential crawl of
+    the same links, and every fetched article's links are added to graph.
+    With a checkpoint the crawl is recorded as it goes and resumes where a
+    previous run stopped.
+    """
+
+    def __init__(self, main_topic, max_articles=50, max_workers=8, client=None, checkpoint=None, depth=1):
+        self.main_topic = main_topic
+        self.max_articles = max_articles
+        self.max_workers = max_workers
+        self.client = client or WikiClient()
+        self.checkpoint = checkpoint
+        self.depth = depth
+        self.results = defaultdict(list)
+        self.graph = LinkGraph()
+        self.candidates = []
+        # End of each level in candidates
+        self.levels = []
+        self.done = set()
+
+    def crawl(self):
+        print(f"Starting exploration of {self.main_topic}...")
+
+        state, records = self.checkpoint.load() if self.checkpoint else (None, [])
+        if state is not None:
+            if state['main_topic'] != self.main_topic:
+                raise ValueError(f"Checkpoint in {self.checkpoint.directory} is for '{state['main_topic']}'")
+            print(f"Resuming: {len(records)} titles already fetched")
+            self.candidates = state['candidates']
+            self.levels = state.get('levels', [len(self.candidates)])
+            for record in records:
+                self._restore(record)
+        else:
+            main_article = self._fetch(self.main_topic, with_links=True)
+            if not main_article:
+                return dict(self.results)
+            self.candidates = self.select_links(main_article['links'], {self.main_topic})
+            self.levels = [len(self.candidates)]
+            self._save_state()
+            self._record(self.main_topic, main_article)
+
+        count = len(self.done.intersection(self.candidates))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            level = 0
+            while level < len(self.levels):
+                start = self.levels[level - 1] if level else 0
+                titles = self.candidates[start:self.levels[level]]
+                if not level:
+                    # Only pending if a previous run died right after selecting links
+                    titles = [self.main_topic] + titles
+                count = self._crawl_level(pool, [title for title in titles if title not in self.done], count)
+
+                if level + 1 == len(self.levels) and len(self.levels) < self.depth:
+                    self._expand(titles)
+                level += 1
+
+        if self.checkpoint:
+            self._save_state()
+            self.checkpoint.close()
+        return dict(self.results)
+
+    def _crawl_level(self, pool, titles, count):
+        """Fetch titles in batches on the pool and record them in order"""
+        batches = [titles[start:start + self.client.MAX_TITLES]
+                   for start in range(0, len(titles), self.client.MAX_TITLES)]
+        # map yields in submission order while fetching runs ahead concurrently
+        for batch, articles in zip(batches, pool.map(self._fetch_batch, batches)):
+            for title in batch:
+                article = articles.get(title)
+                if isinstance(article, ArticleSkipped):
+                    print(f"Skipping '{title}': {str(article)}")
+                    self._record(title, None, skipped=str(article))
+                elif article:
+                    self._record(title, article)
+                if title != self.main_topic:
+                    count += 1
+                    print(f"Progress: {count}/{self.max_articles} articles explored")
+        return count
+
+    def _expand(self, titles):
+        """Select the next level from the links of titles, while articles remain"""
+        limit = self.max_articles - len(self.candidates)
+        if limit <= 0:
+            return
+        links = [link for title in titles for link in self.graph.neighbors(title)]
+        selected = self.select_links(links, {self.main_topic, *self.candidates}, limit)
+        if selected:
+            self.candidates = self.candidates + selected
+            self.levels.append(len(self.candidates))
+            self._save_state()
+
+    def select_links(self, links, explored, limit=None):
+        """The first limit (default max_articles) unexplored links that mention the main topic"""
+        limit = self.max_articles if limit is None else limit
+        selected = []
+        explored = set(explored)
+        for link in links:
+            if len(selected) >= limit:
+                break
+            if (self.main_topic.lower() in link.lower() and
+                    link not in explored and
+                    not any(skip in link.lower() for skip in SKIP_LINKS)):
+                selected.append(link)
+                explored.add(link)
+        return selected
+
+    def _fetch(self, title, with_links=False):
+        """Fetch one article, reporting and swallowing failures"""
+        print(f"\nExploring: {title}")
         try:
-            page = wikipedia.page(title, auto_suggest=False)
-        except (wikipedia.DisambiguationError, wikipedia.PageError) as e:
+            return self.client.fetch_article(title, with_links=with_links)
+        except ArticleSkipped as e:
             print(f"Skipping '{title}': {str(e)}")
-            return None
         except Exception as e:
             print(f"Error exploring '{title}': {str(e)}")
-            return None
-
-        if not page:
-            return None
+        return None
 
-        # Get categories
+    def _fetch_batch(self, titles):
+        """Fetch a batch of articles, reporting a failed request for every title in it"""
+        for title in titles:
+            print(f"\nExploring: {title}")
         try:
-            categories = page.categories
-        except:
-            categories = []
-
-        # Determine main category
-        main_category = "General"
-        for cat in categories:
-            cat_lower = cat.lower()
-            if main_topic.lower() in cat_lower:
-                main_category = cat.replace("Category:", "").strip()
-                break
-
-        # Store article information
-        article_info = {
-            "title": page.title,
-            "url": page.url,
-            "summary": page.summary[:200] + "..." if page.summary else "No summary available",
-            "categories": categories[:5] if categories else []
-        }
+            return self.client.fetch_articles(titles, with_links=True)
+        except Exception as e:
+            for title in titles:
+                print(f"Error exploring '{title}': {str(e)}")
+            return {}
 
-        results[main_category].append(article_info)
+    def _record(self, title, article, skipped=None):
+        """Store a finished title in the results and the checkpoint"""
+        record = {'title': title, 'category': None, 'article': None, 'skipped': skipped}
+        if article:
+            record['category'] = main_category(self.main_topic, article['categories'])
+            record['article'] = article_info(article)
+            record['links'] = article['links']
+        self._restore(record)
 
-        try:
-            return page.links
-        except:
-            return []
+        if self.checkpoint:
+            self.checkpoint.append(record)
+            if len(self.done) % self.checkpoint.checkpoint_every == 0:
+                self._save_state()
 
-    # Start with main topic exploration
-    print(f"Starting exploration of {main_topic}...")
+    def _restore(self, record):
+        """Add a finished title's record to the in-memory results"""
+        self.done.add(record['title'])
+        if record.get('links'):
+            self.graph.add_links(record['title'], record['links'])
+        if record['article']:
+            self.results[record['category']].append(record['article'])
 
-    # First get the main topic page
-    main_page = safe_wiki_request(wikipedia.page, main_topic)
-    if main_page:
-        main_links = explore_article(main_topic)
+    def _save_state(self):
+        if self.checkpoint:
+            self.checkpoint.save_state({
+                'main_topic': self.main_topic,
+                'candidates': self.candidates,
+                'levels': self.levels,
+                'remaining': [title for title in self.candidates if title not in self.done]
+            })
 
-        if main_links:
-            # Explore related topics
-            total_explored = 0
-            for link in main_links:
-                if total_explored >= 50:  # Limit to prevent too many requests
-                    break
 
-                if (main_topic.lower() in link.lower() and
-                        link not in explored and
-                        not any(skip in link.lower() for skip in ['list of', 'index of', 'template:'])):
-                    explore_article(link)
-                    total_explored += 1
-                    print(f"Progress: {total_explored}/50 articles explored")
+def explore_wiki_network(main_topic, max_articles=50, max_workers=8, requests_per_second=5, timeout=10,
+                         api_url=API_URL, checkpoint_dir=None, checkpoint_every=10, depth=1, graph_dir=None):
+    """
+    Comprehensively explores Wikipedia articles related to a main topic
 
-    return dict(results)
+    With checkpoint_dir, results are appended to checkpoint_dir/results.jsonl
+    as they arrive and a crawl started again with the same directory resumes
+    without refetching anything. depth sets how many links away from the main
+    topic articles are explored. With graph_dir, the link graph of every
+    fetched article is saved there (see LinkGraph.load).
+    """
+    client = WikiClient(api_url=api_url, requests_per_second=requests_per_second, timeout=timeout)
+    checkpoint = CrawlCheckpoint(checkpoint_dir, checkpoint_every) if checkpoint_dir else None
+    crawler = WikiCrawler(main_topic, max_articles, max_workers, client, checkpoint, depth)
+    results = crawler.crawl()
+    if graph_dir:
+        crawler.graph.save(graph_dir)
+    return results
 
 
 def save_results(results, topic):
@@ -137,15 +446,29 @@ def print_results(results):
             print(f"\n  ... and {len(articles) - 5} more articles")
 
 
+def print_rankings(graph, k=10):
+    """Print the most central articles of a link graph"""
+    print("\n" + "=" * 80)
+    print(f"Link graph: {len(graph)} titles, {graph.edge_count} links")
+    print("=" * 80)
+    print("\nTop articles by PageRank:")
+    for title, score in graph.top(graph.pagerank(), k):
+        print(f"  {score:.5f}  {title}")
+    print("\nMost linked-to articles:")
+    for title, links in graph.top(graph.in_degree(), k):
+        print(f"  {links:7d}  {title}")
+
+
 if __name__ == "__main__":
     main_topic = "France"
     print(f"Starting comprehensive exploration of Wikipedia articles related to {main_topic}...")
 
-    results = explore_wiki_network(main_topic)
-
-    # Save results
-    filename = save_results(results, main_topic)
-    print(f"\nResults saved to {filename}")
+    # Results are appended to the checkpoint as the crawl goes; rerun to resume
+    checkpoint_dir = f"{main_topic.lower()}_wiki_crawl"
+    graph_dir = os.path.join(checkpoint_dir, 'graph')
+    results = explore_wiki_network(main_topic, depth=2, checkpoint_dir=checkpoint_dir, graph_dir=graph_dir)
+    print(f"\nResults saved to {os.path.join(checkpoint_dir, 'results.jsonl')}")
 
     # Print results
-    print_results(results)
\ No newline at end of file
+    print_results(results)
+    print_rankings(LinkGraph.load(graph_dir))
\ No newline at end of file
@@ -1,14 +1,278 @@
+import codecs
+import heapq
+import os
 import re
+import string
+import sys
+from array import array
 from collections import Counter
-from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial, reduce
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import matplotlib.pyplot as plt
 
+ASCII_WHITESPACE = re.compile(rb'[ \t\n\r\x0b\x0c]')
+
+# Text is split into windows of this many characters so word lists stay small
+WINDOW_SIZE = 1 << 16
+
+# Bucket in the fixed letter array for each ASCII letter, either case
+ASCII_LETTER_INDEX = {letter: i for i, letter in enumerate(string.ascii_uppercase)}
+ASCII_LETTER_INDEX.update({letter: i for i, letter in enumerate(string.ascii_lowercase)})
+
+
+class PrefixTrie:
+    """
+    Counting trie of uppercased words, or of their first max_depth letters
+
+    Every node stores how many words pass through it, so the number of words
+    starting with a prefix is read off the prefix's node in O(len(prefix)).
+    Nodes live in flat arrays (a count array and one child dict per inner
+    node), and max_nodes is checked before every node is created, so the
+    trie never grows past its bound.
+    """
+
+    def __init__(self, max_depth: Optional[int] = None, max_nodes: int = 1_000_000):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.counts = array('q', [0])
+        self.children: List[Optional[Dict[str, int]]] = [None]
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _child(self, node: int, char: str) -> int:
+        """
+        The child of node for char, creating it within the node budget
+        """
+        children = self.children[node]
+        if children is None:
+            children = self.children[node] = {}
+        child = children.get(char)
+        if child is None:
+            if len(self.counts) >= self.max_nodes:
+                raise ValueError(f"Prefix index would exceed {self.max_nodes} nodes; "
+                                 f"use a smaller max_depth or a larger max_nodes")
+            child = children[char] = len(self.counts)
+            self.counts.append(0)
+            self.children.append(None)
+        return child
+
+    def add(self, word: str, count: int = 1):
+        """
+        Count an uppercased word count times
+        """
+        counts = self.counts
+        node = 0
+        counts[0] += count
+        for char in word[:self.max_depth]:
+            node = self._child(node, char)
+            counts[node] += count
+
+    def update(self, words: Dict[str, int]):
+        """
+        Count every uppercased word of a word -> count mapping
+        """
+        for word, count in words.items():
+            self.add(word, count)
+
+    def count(self, prefix: str) -> int:
+        """
+        Number of words starting with an uppercased prefix
+        """
+        if self.max_depth is not None and len(prefix) > self.max_depth:
+            raise ValueError(f"Prefix index only covers prefixes of up to {self.max_depth} letters")
+        node = 0
+        for char in prefix:
+            children = self.children[node]
+            node = children.get(char) if children else None
+            if node is None:
+                return 0
+        return self.counts[node]
+
+    def prefixes(self, depth: int) -> Iterator[Tuple[str, int]]:
+        """
+        Every prefix of exactly depth letters with its count
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            raise ValueError(f"Prefix index only covers prefixes of up to {self.max_depth} letters")
+        stack = [('', 0)]
+        while stack:
+            prefix, node = stack.pop()
+            if len(prefix) == depth:
+                yield prefix, self.counts[node]
+            elif self.children[node]:
+                stack.extend((prefix + char, child) for char, child in self.children[node].items())
+
+    def merge(self, other: 'PrefixTrie') -> 'PrefixTrie':
+        """
+        Add the counts of another trie into this one and return self
+        """
+        stack = [(0, 0)]
+        while stack:
+            node, other_node = stack.pop()
+            self.counts[node] += other.counts[other_node]
+            for char, other_child in (other.children[other_node] or {}).items():
+                stack.append((self._child(node, char), other_child))
+        return self
+
+    def memory(self) -> int:
+        """
+        Approximate memory used by the trie in bytes
+        """
+        return (sys.getsizeof(self.counts) + sys.getsizeof(self.children) +
+                sum(sys.getsizeof(children) for children in self.children if children is not None))
+
+
+def _count_first_letters(chunks: Iterable[str], prefix_index: Optional[PrefixTrie] = None) -> Dict[str, int]:
+    """
+    Count the uppercased first letter of every word in a stream of text chunks
+
+    Each window is split with str.split(), which breaks on the same Unicode
+    whitespace as a regex split on whitespace, and only first characters are
+    kept. A-Z go into a fixed 26-slot integer array; any other letter
+    overflows into a dict. Words split across chunk or window boundaries are
+    counted once. With a prefix_index, the same pass also adds every
+    uppercased word to it, rejoining words split across windows.
+    """
+    ascii_counts = array('q', [0] * 26)
+    overflow = Counter()
+    in_word = False
+    # Start of a word still running at the end of the previous window
+    carry = ''
+
+    for chunk in chunks:
+        for start in range(0, len(chunk), WINDOW_SIZE):
+            window = chunk[start:start + WINDOW_SIZE]
+            words = window.split()
+            continues = in_word and not window[0].isspace()
+            in_word = not window[-1].isspace()
+
+            if prefix_index is not None:
+                pieces = list(words)
+                if continues:
+                    pieces[0] = carry + pieces[0]
+                elif carry:
+                    pieces.insert(0, carry)
+                carry = pieces.pop() if in_word else ''
+                if prefix_index.max_depth is not None:
+                    # Only the indexed letters of an unfinished word matter
+                    carry = carry[:prefix_index.max_depth]
+                prefix_index.update(Counter(
+                    word.upper() for word in pieces if word[0].isalpha()
+                ))
+
+            if continues:
+                # The first piece finishes a word from the previous window
+                words = islice(words, 1, None)
+            for char, count in Counter(map(itemgetter(0), words)).items():
+                index = ASCII_LETTER_INDEX.get(char)
+                if index is not None:
+                    ascii_counts[index] += count
+                elif char.isalpha():
+                    overflow[char.upper()] += count
+
+    if prefix_index is not None and carry and carry[0].isalpha():
+        prefix_index.add(carry.upper())
+
+    frequencies = {letter: count for letter, count in zip(string.ascii_uppercase, ascii_counts) if count}
+    for letter, count in overflow.items():
+        frequencies[letter] = frequencies.get(letter, 0) + count
+    return frequencies
+
 
 class TextAnalyzer:
-    def __init__(self, text: str):
+    def __init__(self, text: str, prefix_index: bool = False, prefix_depth: Optional[int] = None,
+                 max_prefix_nodes: int = 1_000_000):
         self.text = text
-        self.words = self._preprocess_text()
+        self._words = None
+        # Built in the same pass as the letter counts when requested
+        self.prefix_index = PrefixTrie(prefix_depth, max_prefix_nodes) if prefix_index else None
         self.letter_frequencies = self._calculate_frequencies()
+        self.total_words = sum(self.letter_frequencies.values())
+
+    @property
+    def words(self) -> Optional[List[str]]:
+        """
+        Words of the analyzed text, built on first access (None without text)
+        """
+        if self._words is None and self.text is not None:
+            self._words = self._preprocess_text()
+        return self._words
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[str], prefix_index: bool = False, prefix_depth: Optional[int] = None,
+                    max_prefix_nodes: int = 1_000_000) -> 'TextAnalyzer':
+        """
+        Analyze text supplied as an iterable of string chunks
+
+        Only first letters (and, with prefix_index, the prefix trie) are
+        built as the chunks stream past, so neither the text nor a word list
+        is kept in memory. Words split across chunk boundaries are counted once.
+        """
+        trie = PrefixTrie(prefix_depth, max_prefix_nodes) if prefix_index else None
+        return cls._from_frequencies(_count_first_letters(chunks, trie), trie)
+
+    @classmethod
+    def from_file(cls, path: str, encoding: str = 'utf-8', chunk_size: int = 1 << 20,
+                  **prefix_options) -> 'TextAnalyzer':
+        """
+        Analyze a text file of any size using buffered reads of chunk_size characters
+
+        prefix_options are the prefix index options of from_chunks.
+        """
+        with open(path, encoding=encoding) as f:
+            return cls.from_chunks(iter(partial(f.read, chunk_size), ''), **prefix_options)
+
+    @classmethod
+    def _from_frequencies(cls, letter_frequencies: Dict[str, int],
+                          prefix_index: Optional[PrefixTrie] = None) -> 'TextAnalyzer':
+        """
+        Build an analyzer holding only letter counts, without any text or words
+        """
+        analyzer = cls.__new__(cls)
+        analyzer.text = None
+        analyzer._words = None
+        analyzer.letter_frequencies = dict(letter_frequencies)
+        analyzer.total_words = sum(analyzer.letter_frequencies.values())
+        analyzer.prefix_index = prefix_index
+        return analyzer
+
+    def merge(self, other: 'TextAnalyzer') -> 'TextAnalyzer':
+        """
+        Add the counts of another analyzer into this one and return self
+
+        The merged analyzer describes more text than it holds, so its text and
+        word list are dropped. Prefix indexes are merged when both sides have
+        one of the same depth and dropped otherwise.
+        """
+        for letter, count in other.letter_frequencies.items():
+            self.letter_frequencies[letter] = self.letter_frequencies.get(letter, 0) + count
+        self.total_words += other.total_words
+        if (self.prefix_index is not None and other.prefix_index is not None and
+                self.prefix_index.max_depth == other.prefix_index.max_depth):
+            self.prefix_index.merge(other.prefix_index)
+        else:
+            self.prefix_index = None
+        self.text = None
+        self._words = None
+        return self
+
+    def __add__(self, other: 'TextAnalyzer') -> 'TextAnalyzer':
+        result = self._from_frequencies(self.letter_frequencies)
+        if self.prefix_index is not None:
+            trie = self.prefix_index
+            result.prefix_index = PrefixTrie(trie.max_depth, trie.max_nodes).merge(trie)
+        return result.merge(other)
+
+    def __getstate__(self):
+        # Only the counts travel between processes, never the original text
+        state = self.__dict__.copy()
+        state['text'] = None
+        state['_words'] = None
+        return state
 
     def _preprocess_text(self) -> List[str]:
         """
@@ -23,9 +287,48 @@ class TextAnalyzer:
         """
         Calculate the frequency of each starting letter
         """
-        # Get first letter of each word and convert to uppercase
-        first_letters = [word[0].upper() for word in self.words]
-        return dict(Counter(first_letters))
+        return _count_first_letters([self.text], self.prefix_index)
+
+    def build_prefix_index(self, max_depth: Optional[int] = None, max_nodes: int = 1_000_000) -> 'TextAnalyzer':
+        """
+        Build the prefix index of an analyzer created without one
+
+        Takes one more pass over the text. Analyzers without text (from_file,
+        from_chunks, merged ones) build theirs during counting instead, with
+        prefix_index=True.
+        """
+        if self.text is None:
+            raise ValueError("Without the original text, pass prefix_index=True when counting instead")
+        trie = PrefixTrie(max_depth, max_nodes)
+        _count_first_letters([self.text], trie)
+        self.prefix_index = trie
+        return self
+
+    def prefix_count(self, prefix: str) -> int:
+        """
+        Number of words starting with prefix (case-insensitive), in O(len(prefix))
+        """
+        return self._trie().count(prefix.upper())
+
+    def top_prefixes(self, depth: int, k: Optional[int] = 10) -> List[Tuple[str, int]]:
+        """
+        Most common prefixes of the given depth, most frequent first (all if k is None)
+        """
+        prefixes = self._trie().prefixes(depth)
+        if k is None:
+            return sorted(prefixes, key=lambda x: x[1], reverse=True)
+        return heapq.nlargest(k, prefixes, key=lambda x: x[1])
+
+    def prefix_index_memory(self) -> int:
+        """
+        Approximate memory used by the prefix index in bytes
+        """
+        return self.prefix_index.memory() if self.prefix_index is not None else 0
+
+    def _trie(self) -> PrefixTrie:
+        if self.prefix_index is None:
+            raise ValueError("No prefix index; create the analyzer with prefix_index=True")
+        return self.prefix_index
 
     def get_frequencies_sorted(self) -> List[Tuple[str, int]]:
         """
@@ -37,7 +340,7 @@ class TextAnalyzer:
         """
         Print detailed analysis of the text
         """
-        total_words = len(self.words)
+        total_words = self.total_words
         print(f"\nTotal words analyzed: {total_words}")
         print("\nStarting Letter Frequencies:")
         print("-" * 30)
@@ -74,6 +377,111 @@ def analyze_text(text: str, plot: bool = True):
         analyzer.plot_frequencies()
 
 
+def _byte_ranges(path: str, range_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into byte ranges of roughly range_bytes
+
+    Each cut is placed just after an ASCII whitespace byte, so no word and no
+    UTF-8 sequence straddles two ranges.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, 'rb') as f:
+        while start < size:
+            end = start + range_bytes
+            if end < size:
+                f.seek(end)
+                while True:
+                    block = f.read(1 << 16)
+                    if not block:
+                        end = size
+                        break
+                    match = ASCII_WHITESPACE.search(block)
+                    if match:
+                        end += match.end()
+                        break
+                    end += len(block)
+            end = min(end, size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _read_range(path: str, start: int, end: int, encoding: str,
+                chunk_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Yield the decoded text of a byte range in chunks
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(chunk_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield decoder.decode(block)
+    yield decoder.decode(b'', final=True)
+
+
+def _analyze_task(task: Tuple[str, int, Optional[int], str, dict]) -> TextAnalyzer:
+    """
+    Worker for analyze_corpus: count one file or one byte range of a file
+    """
+    path, start, end, encoding, prefix_options = task
+    if end is None:
+        return TextAnalyzer.from_file(path, encoding=encoding, **prefix_options)
+    return TextAnalyzer.from_chunks(_read_range(path, start, end, encoding), **prefix_options)
+
+
+def analyze_corpus(paths: Iterable[str], processes: Optional[int] = None,
+                   range_bytes: int = 64 << 20, encoding: str = 'utf-8', **prefix_options) -> TextAnalyzer:
+    """
+    Analyze many files (or directories of files) in parallel
+
+    Files are fanned out to a process pool; files larger than range_bytes are
+    split into byte ranges first so a single huge file also uses every core
+    (only for UTF-8 compatible encodings). Each worker returns a compact
+    count-only TextAnalyzer and the parent merges them. prefix_options
+    (prefix_index, prefix_depth, max_prefix_nodes) give every worker a prefix
+    trie, merged like the counts.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+
+    splittable = codecs.lookup(encoding).name in ('utf-8', 'ascii')
+    tasks = []
+    for path in files:
+        if splittable and os.path.getsize(path) > range_bytes:
+            tasks.extend((path, start, end, encoding, prefix_options)
+                         for start, end in _byte_ranges(path, range_bytes))
+        else:
+            tasks.append((path, 0, None, encoding, prefix_options))
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # Batch small tasks so thousands of tiny documents don't cost a round-trip each
+        chunksize = max(1, len(tasks) // ((processes or os.cpu_count() or 1) * 4))
+        partials = executor.map(_analyze_task, tasks, chunksize=chunksize)
+        return reduce(TextAnalyzer.merge, partials, TextAnalyzer.from_chunks((), **prefix_options))
+
+
+def analyze_file(path: str, plot: bool = True):
+    """
+    Analyze a text file without loading it into memory
+    """
+    analyzer = TextAnalyzer.from_file(path)
+    analyzer.print_analysis()
+    if plot:
+        analyzer.plot_frequencies()
+
+
 # Example usage
 if __name__ == "__main__":
     sample_text = """
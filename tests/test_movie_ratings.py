@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip('bs4')
+pytest.importorskip('dateutil')
+requests = pytest.importorskip('requests')
+
+from movie_ratings import NO_RATINGS, OMDbClient, enrich_movies
+
+# Seconds the fake server takes per lookup, long enough for calls to overlap
+LATENCY = 0.2
+
+
+class FakeOMDb(BaseHTTPRequestHandler):
+    """Answers ?t=TITLE with ratings derived from the title, tracking concurrent requests"""
+
+    def do_GET(self):
+        title = parse_qs(urlparse(self.path).query)['t'][0]
+        with self.server.lock:
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        try:
+            time.sleep(LATENCY)
+            if title == 'Broken':
+                self.send_error(500)
+                return
+            if title == 'Unknown':
+                data = {'Response': 'False', 'Error': 'Movie not found!'}
+            else:
+                number = int(title.split()[-1])
+                data = {'Response': 'True', 'Title': title, 'imdbRating': f'{number % 10}.5',
+                        'Ratings': [{'Source': 'Rotten Tomatoes', 'Value': f'{number}%'},
+                                    {'Source': 'Metacritic', 'Value': f'{number}/100'}]}
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def omdb():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOMDb)
+    server.lock = threading.Lock()
+    server.active = server.max_active = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(server, **options):
+    return OMDbClient(api_key='test', base_url=f'http://127.0.0.1:{server.server_port}/', **options)
+
+
+def test_enrich_movies_keeps_order_and_falls_back_to_na(omdb):
+    titles = [f'Movie {i}' for i in range(14)] + ['Broken', 'Unknown']
+    movies = [{'number': str(i), 'title': title} for i, title in enumerate(titles)]
+    client = client_for(omdb, requests_per_second=1000, pool_size=8)
+
+    started = time.perf_counter()
+    enriched = enrich_movies(movies, max_workers=8, client=client)
+    elapsed = time.perf_counter() - started
+
+    assert [movie['title'] for movie in enriched] == titles
+    assert enriched[3] == {'number': '3', 'title': 'Movie 3', 'IMDb Rating': '3.5',
+                           'Rotten Tomatoes': '3%', 'Metacritic': '3/100'}
+    # Server errors and unknown titles fall back to N/A
+    for movie in enriched[-2:]:
+        assert {key: movie[key] for key in NO_RATINGS} == NO_RATINGS
+    # Sequential lookups would take len(titles) * LATENCY
+    assert elapsed < len(titles) * LATENCY / 2
+
+
+def test_lookups_overlap_up_to_max_workers(omdb):
+    client = client_for(omdb, requests_per_second=1000, pool_size=8)
+    movies = [{'title': f'Movie {i}'} for i in range(16)]
+
+    enrich_movies(movies, max_workers=8, client=client)
+
+    assert 1 < omdb.max_active <= 8
+
+
+def test_rate_limit_spaces_lookups(omdb):
+    client = client_for(omdb, requests_per_second=5)
+    movies = [{'title': f'Movie {i}'} for i in range(10)]
+
+    started = time.perf_counter()
+    enrich_movies(movies, max_workers=8, client=client)
+
+    # A burst of 5 tokens, then one every 0.2 s for the other 5
+    assert time.perf_counter() - started >= 0.9
+
+
+def test_session_passed_in_is_not_reconfigured():
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(max_retries=5)
+    session.mount('http://', adapter)
+
+    client = OMDbClient(session=session)
+
+    assert client.session is session
+    assert session.get_adapter('http://www.omdbapi.com/') is adapter
+
+
+def test_own_session_is_pooled():
+    client = OMDbClient(pool_size=8)
+
+    assert client.session.get_adapter('http://www.omdbapi.com/')._pool_maxsize == 8
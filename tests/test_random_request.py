@@ -0,0 +1,188 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip('requests')
+
+from random_request import WikimediaImageFetcher
+
+CATEGORY = 'Test_images'
+# Category members per listing page
+PAGE_SIZE = 25
+
+
+class StubCommons(BaseHTTPRequestHandler):
+    """
+    Commons API (categorymembers listing and imageinfo) plus the image files
+    themselves, served from server.images (file name -> bytes).
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith('/images/'):
+            self.server.image_requests.append(url.path)
+            self.reply(self.server.images[url.path[len('/images/'):]], 'image/png')
+            return
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        names = sorted(self.server.images, key=lambda name: int(name[3:].split('.')[0]))
+        if params.get('list') == 'categorymembers':
+            start = int(params.get('cmcontinue', 0))
+            members = [{'title': f'File:{name}',
+                        'timestamp': (datetime(2025, 1, 1) + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+                       for i, name in enumerate(names[start:start + PAGE_SIZE], start)]
+            data = {'query': {'categorymembers': members}}
+            if start + PAGE_SIZE < len(names):
+                data['continue'] = {'cmcontinue': str(start + PAGE_SIZE), 'continue': '-||'}
+        else:
+            pages = {}
+            for i, title in enumerate(params['titles'].split('|')):
+                body = self.server.images[title[len('File:'):]]
+                pages[str(-1 - i)] = {'ns': 6, 'title': title, 'imageinfo': [{
+                    'url': f'http://127.0.0.1:{self.server.server_port}/images/{title[len("File:"):]}',
+                    'size': len(body),
+                    'sha1': hashlib.sha1(body).hexdigest(),
+                    'extmetadata': {'Artist': {'value': 'Tester'}, 'License': {'value': 'cc0'}}
+                }]}
+            data = {'query': {'pages': pages}}
+        self.reply(json.dumps(data).encode('utf-8'), 'application/json')
+
+    def reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def commons():
+    servers = []
+
+    def serve(images):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubCommons)
+        server.images = images
+        server.image_requests = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_fetcher(tmp_path):
+    fetchers = []
+
+    def make(server):
+        fetcher = WikimediaImageFetcher(save_dir=str(tmp_path / 'images'), backoff=0)
+        fetcher.api_url = f'http://127.0.0.1:{server.server_port}/w/api.php'
+        fetcher.categories = [CATEGORY]
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.catalog.close()
+        fetcher.category_index.close()
+
+
+def distinct_images(count):
+    return {f'Img{i}.png': f'image {i} '.encode('ascii') * 500 for i in range(count)}
+
+
+def test_fetch_many_downloads_distinct_images(commons, make_fetcher):
+    server = commons(distinct_images(60))
+    fetcher = make_fetcher(server)
+
+    saved = fetcher.fetch_many(20, concurrency=4)
+
+    assert len(saved) == 20
+    assert len(fetcher.catalog) == 20
+    # The whole listing was indexed across continuation pages
+    assert fetcher.category_index.count(CATEGORY) == 60
+    assert len(server.image_requests) == 20
+    for path in saved:
+        with open(os.path.join(fetcher.save_dir, path), 'rb') as f:
+            assert hashlib.sha1(f.read()).hexdigest() == os.path.basename(path).split('.')[0]
+
+
+def test_fetch_many_skips_catalogued_titles(commons, make_fetcher):
+    server = commons(distinct_images(5))
+    fetcher = make_fetcher(server)
+
+    assert len(fetcher.fetch_many(3)) == 3
+    assert len(fetcher.fetch_many(5)) == 2
+    assert len(fetcher.catalog) == 5
+    assert len(server.image_requests) == 5
+
+
+def test_fetch_many_processes_images(commons, make_fetcher):
+    Image = pytest.importorskip('PIL.Image')
+    images = {}
+    for i, color in enumerate(['red', 'green', 'blue']):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+        images[f'Img{i}.png'] = buffer.getvalue()
+    images['Img3.png'] = b'\x89PNG\r\n\x1a\n' + b'not an image' * 20
+    fetcher = make_fetcher(commons(images))
+
+    saved = fetcher.fetch_many(4, process=True, processes=1, variants={'thumb': (16, 16)})
+
+    assert len(saved) == 4
+    results = {os.path.basename(path).split('.')[0]: path for path in saved}
+    errors = 0
+    for sha1 in results:
+        result = fetcher.catalog.processing(sha1)
+        if result['error']:
+            errors += 1
+            continue
+        assert (result['width'], result['height'], result['format']) == (64, 48, 'PNG')
+        thumb = os.path.join(fetcher.save_dir, result['variants']['thumb'])
+        with Image.open(thumb) as variant:
+            assert max(variant.size) == 16
+    assert errors == 1
+
+
+def test_daily_fetch_stores_a_new_image_every_run(commons, make_fetcher):
+    server = commons(distinct_images(3))
+    fetcher = make_fetcher(server)
+
+    for run in range(1, 4):
+        fetcher.fetch_daily_image()
+        assert len(fetcher.catalog) == run
+    assert len(server.image_requests) == 3
+
+    # Nothing new is left, so the run fails instead of reporting an old image
+    fetcher.fetch_daily_image()
+    assert len(fetcher.catalog) == 3
+    assert len(server.image_requests) == 3
+
+
+def test_duplicate_content_is_not_downloaded_again(commons, make_fetcher):
+    images = distinct_images(2)
+    images['Img1.png'] = images['Img0.png']
+    server = commons(images)
+    fetcher = make_fetcher(server)
+    infos = fetcher.get_image_infos(['File:Img0.png', 'File:Img1.png'], {})
+
+    first = fetcher.download_image(infos['File:Img0.png'])
+    second = fetcher.download_image(infos['File:Img1.png'])
+
+    assert first == second
+    assert len(server.image_requests) == 1
+    assert fetcher.catalog.path_for_title('File:Img1.png') == first
+    assert len(os.listdir(os.path.dirname(os.path.join(fetcher.save_dir, first)))) == 1
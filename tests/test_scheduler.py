@@ -0,0 +1,171 @@
+import json
+
+import pytest
+
+import scheduler
+from scheduler import ALLOW, QUEUE, SKIP, Scheduler
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(1000.0)
+
+
+def make_scheduler(clock, **options):
+    """A scheduler whose runs are recorded instead of submitted to the pool"""
+    sched = Scheduler(clock=clock, **options)
+    sched.started = []
+    sched._start = lambda job, due: sched.started.append((job.name, due, clock()))
+    return sched
+
+
+def finish(sched, index=0):
+    """Complete a recorded run as the pool would"""
+    name, due, _ = sched.started[index]
+    sched._run(sched.jobs[name], due)
+
+
+def noop():
+    pass
+
+
+def test_first_run_after_one_interval(clock):
+    sched = make_scheduler(clock)
+    sched.every(10, noop)
+
+    assert sched.run_pending() == 10
+    clock.now += 10
+    assert sched.run_pending() == 10
+    assert sched.started == [('noop', 1010, 1010)]
+
+
+def test_skip_drops_runs_while_busy(clock):
+    sched = make_scheduler(clock)
+    job = sched.every(10, noop, overlap=SKIP, run_now=True)
+    sched.run_pending()
+
+    clock.now += 10
+    sched.run_pending()
+    clock.now += 10
+    sched.run_pending()
+    assert len(sched.started) == 1
+    assert job.running == 1
+
+    finish(sched)
+    assert job.running == 0
+    assert len(sched.started) == 1
+
+    clock.now += 10
+    sched.run_pending()
+    assert [due for _, due, _ in sched.started] == [1000, 1030]
+
+
+def test_queue_runs_once_more_after_busy_run(clock):
+    sched = make_scheduler(clock)
+    job = sched.every(10, noop, overlap=QUEUE, run_now=True)
+    sched.run_pending()
+
+    # Two deadlines pass while the first run is busy
+    for _ in range(2):
+        clock.now += 10
+        sched.run_pending()
+    assert len(sched.started) == 1
+    assert job.queued
+
+    clock.now += 5
+    finish(sched)
+    assert sched.started[1] == ('noop', 1025, 1025)
+    assert job.running == 1
+    assert not job.queued
+
+
+def test_allow_starts_overlapping_runs(clock):
+    sched = make_scheduler(clock)
+    job = sched.every(10, noop, overlap=ALLOW, run_now=True)
+    sched.run_pending()
+    clock.now += 10
+    sched.run_pending()
+
+    assert [due for _, due, _ in sched.started] == [1000, 1010]
+    assert job.running == 2
+
+
+def test_jitter_keeps_nominal_schedule(clock, monkeypatch):
+    sched = make_scheduler(clock)
+    # Always the largest possible delay, the worst case for drift
+    monkeypatch.setattr(scheduler.random, 'uniform', lambda low, high: high)
+    sched.every(10, noop, overlap=ALLOW, jitter=4)
+
+    for _ in range(20):
+        clock.now += sched.run_pending()
+    sched.run_pending()
+
+    dues = [due for _, due, _ in sched.started]
+    assert dues == [1010 + 10 * i for i in range(20)]
+    assert all(started == due + 4 for _, due, started in sched.started)
+
+
+def test_missed_runs_are_skipped_on_the_original_phase(clock):
+    sched = make_scheduler(clock)
+    sched.every(10, noop, overlap=ALLOW)
+
+    # Asleep across several deadlines
+    clock.now += 45
+    assert sched.run_pending() == 5
+    assert [due for _, due, _ in sched.started] == [1010]
+
+
+def test_successful_run_saves_state(clock, tmp_path):
+    state_path = str(tmp_path / 'state.json')
+    sched = make_scheduler(clock, state_path=state_path)
+    sched.every(10, noop, run_now=True)
+    sched.run_pending()
+    finish(sched)
+
+    with open(state_path, encoding='utf-8') as f:
+        assert json.load(f) == {'noop': 1000}
+
+
+def test_failed_run_does_not_save_state(clock, tmp_path):
+    state_path = tmp_path / 'state.json'
+
+    def broken():
+        raise RuntimeError('boom')
+
+    sched = make_scheduler(clock, state_path=str(state_path))
+    sched.every(10, broken, run_now=True)
+    sched.run_pending()
+    finish(sched)
+
+    assert not state_path.exists()
+
+
+@pytest.mark.parametrize('last_run, catch_up, first_due', [
+    (900, True, 1000),     # missed the run due at 910: catch up now
+    (900, False, 1010),    # missed but catch_up is off
+    (995, True, 1010),     # next run at 1005 not missed yet
+])
+def test_catch_up_from_state_file(clock, tmp_path, last_run, catch_up, first_due):
+    state_path = tmp_path / 'state.json'
+    state_path.write_text(json.dumps({'noop': last_run}), encoding='utf-8')
+    sched = make_scheduler(clock, state_path=str(state_path))
+    sched.every(10, noop, catch_up=catch_up)
+
+    clock.now = first_due
+    sched.run_pending()
+    assert [due for _, due, _ in sched.started] == [first_due]
+
+
+def test_unreadable_state_is_ignored(clock, tmp_path):
+    state_path = tmp_path / 'state.json'
+    state_path.write_text('{not json', encoding='utf-8')
+
+    assert make_scheduler(clock, state_path=str(state_path)).state == {}
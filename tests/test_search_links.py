@@ -0,0 +1,133 @@
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('requests')
+
+from search_links import ArticleSkipped, WikiClient
+
+# Recorded API pages (formatversion=2) for the titles that are not plain articles
+RECORDED_PAGES = {
+    'Missing page': {'ns': 0, 'title': 'Missing page', 'missing': True},
+    'Mercury': {
+        'pageid': 19694, 'ns': 0, 'title': 'Mercury',
+        'fullurl': 'https://en.wikipedia.org/wiki/Mercury',
+        'pageprops': {'disambiguation': ''},
+        'extract': 'Mercury commonly refers to:'
+    },
+    'Python (programming language)': {
+        'pageid': 23862, 'ns': 0, 'title': 'Python (programming language)',
+        'fullurl': 'https://en.wikipedia.org/wiki/Python_(programming_language)',
+        'extract': 'Python is a high-level, general-purpose programming language.'
+    }
+}
+RECORDED_REDIRECTS = {'Python language': 'Python (programming language)'}
+
+
+def recorded_page(title):
+    if title in RECORDED_PAGES:
+        return dict(RECORDED_PAGES[title])
+    return {
+        'pageid': sum(map(ord, title)), 'ns': 0, 'title': title,
+        'fullurl': 'https://en.wikipedia.org/wiki/' + title.replace(' ', '_'),
+        'extract': f'{title} is an article.'
+    }
+
+
+class StubApi(BaseHTTPRequestHandler):
+    """
+    Serves prop=...|categories queries in two continuation pages: the first
+    carries each article's first category, the second (requested with
+    clcontinue) its second one.
+    """
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        self.server.requests.append(params)
+        titles = params['titles'].split('|')
+        second_page = 'clcontinue' in params
+
+        redirects = [{'from': t, 'to': RECORDED_REDIRECTS[t]} for t in titles if t in RECORDED_REDIRECTS]
+        pages = []
+        for title in dict.fromkeys(RECORDED_REDIRECTS.get(t, t) for t in titles):
+            page = recorded_page(title)
+            if not page.get('missing') and 'pageprops' not in page:
+                number = 2 if second_page else 1
+                page['categories'] = [{'ns': 14, 'title': f'Category:{title} topics {number}'}]
+            if second_page:
+                # Continuation pages repeat only the continued property
+                page = {key: page[key] for key in ('ns', 'title', 'categories') if key in page}
+            pages.append(page)
+
+        data = {'batchcomplete': True, 'query': {'pages': pages}}
+        if redirects:
+            data['query']['redirects'] = redirects
+        if not second_page:
+            data['continue'] = {'clcontinue': '0|next', 'continue': '||'}
+
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApi)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(server):
+    return WikiClient(f'http://127.0.0.1:{server.server_port}/w/api.php', requests_per_second=1000)
+
+
+def test_fetch_articles_merges_batches_and_continuations(api):
+    titles = [f'Article {i}' for i in range(117)] + ['Python language', 'Missing page', 'Mercury']
+
+    articles = client_for(api).fetch_articles(titles)
+
+    assert list(articles) == titles
+    assert articles['Article 42'] == {
+        'title': 'Article 42',
+        'url': 'https://en.wikipedia.org/wiki/Article_42',
+        'summary': 'Article 42 is an article.',
+        'categories': ['Article 42 topics 1', 'Article 42 topics 2'],
+        'links': []
+    }
+    redirected = articles['Python language']
+    assert redirected['title'] == 'Python (programming language)'
+    assert redirected['summary'].startswith('Python is')
+    assert isinstance(articles['Missing page'], ArticleSkipped)
+    assert isinstance(articles['Mercury'], ArticleSkipped)
+
+    # One multi-title query per MAX_TITLES titles, each with one continuation page
+    batches = math.ceil(len(titles) / WikiClient.MAX_TITLES)
+    assert len(api.requests) == 2 * batches
+    assert all(len(r['titles'].split('|')) <= WikiClient.MAX_TITLES for r in api.requests)
+
+
+def test_fetch_article_raises_for_skipped_pages(api):
+    client = client_for(api)
+
+    assert client.fetch_article('Python language')['categories'] == [
+        'Python (programming language) topics 1', 'Python (programming language) topics 2'
+    ]
+    with pytest.raises(ArticleSkipped):
+        client.fetch_article('Missing page')
+    with pytest.raises(ArticleSkipped):
+        client.fetch_article('Mercury')
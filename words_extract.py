@@ -1,22 +1,309 @@
-import wikipedia
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.tag import pos_tag
+from collections import namedtuple
 from datetime import datetime
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
 
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
+# wikipedia, nltk and the executors (which load multiprocessing) are imported on
+# first use: importing them costs far more than everything else this module
+# does at import
+NLTK_RESOURCES = ['punkt', 'averaged_perceptron_tagger']
+IMPORT_TIME_BUDGET_MS = 50
 
+DEFAULT_STORE_PATH = 'wiki_pages.sqlite3'
+WIKIPEDIA_API_URL = 'https://en.wikipedia.org/w/api.php'
+USER_AGENT = 'explore_libraries words_extract (https://github.com/azeus/explore_libraries)'
+
+# An article as returned by PageStore
+CachedPage = namedtuple('CachedPage', ['title', 'revision_id', 'content'])
+
+
+class PageNotCached(LookupError):
+    """Raised in offline mode when a topic is not in the page store"""
+
+
+def normalize_title(title):
+    """Normalize a title like MediaWiki: collapse spaces/underscores, capitalize the first letter"""
+    title = re.sub(r'[\s_]+', ' ', title).strip()
+    return title[:1].upper() + title[1:]
+
+
+def setup_nltk_resources():
+    """One-time download of the NLTK data used for tokenizing and tagging"""
+    import nltk
+    for resource in NLTK_RESOURCES:
+        nltk.download(resource)
+
+
+_nltk_models = {}
+
+
+def get_nltk_models():
+    """
+    Load the word tokenizer and POS tagger on first use and reuse them afterwards.
+
+    Returns (word_tokenize, tagger). nltk.pos_tag would build a new tagger on
+    every call, so the tagger is created once per process instead.
+    """
+    if not _nltk_models:
+        from nltk.tokenize import word_tokenize
+        from nltk.tag.perceptron import PerceptronTagger
+        try:
+            word_tokenize("Warm up the tokenizer.")
+            _nltk_models['tagger'] = PerceptronTagger()
+        except LookupError as e:
+            raise LookupError("NLTK data is missing; run `python words_extract.py setup` once") from e
+        _nltk_models['word_tokenize'] = word_tokenize
+    return _nltk_models['word_tokenize'], _nltk_models['tagger']
+
+
+def measure_import_time():
+    """Time a cold import of this module in a fresh interpreter, in milliseconds"""
+    import subprocess
+    code = ("import time; start = time.perf_counter(); import words_extract; "
+            "print((time.perf_counter() - start) * 1000)")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(output.stdout)
+
+
+def fetch_wikipedia_page(topic):
+    """Download the current article for topic"""
+    import wikipedia
+    page = wikipedia.page(topic)
+    # content also loads the revision id, so this costs no extra request
+    content = page.content
+    return CachedPage(page.title, page.revision_id, content)
+
+
+def fetch_wikipedia_revision(title):
+    """
+    Look up only the current revision id of the article titled title.
+
+    One small prop=revisions query, without downloading the content. Returns
+    None when there is no such article.
+    """
+    import requests
+    response = requests.get(WIKIPEDIA_API_URL, params={
+        'action': 'query',
+        'prop': 'revisions',
+        'rvprop': 'ids',
+        'titles': title,
+        'redirects': 1,
+        'format': 'json',
+        'formatversion': 2
+    }, headers={'User-Agent': USER_AGENT}, timeout=10)
+    response.raise_for_status()
+    page = response.json()['query']['pages'][0]
+    revisions = page.get('revisions')
+    return revisions[0]['revid'] if revisions else None
+
+
+class PageStore:
+    """
+    Persistent, content-addressed store of Wikipedia articles in SQLite.
+
+    Bodies are zlib-compressed and stored once per SHA-256 of their content;
+    each normalized title and revision points at its body. Pages older than
+    ttl seconds are revalidated by revision id and only downloaded again when
+    the article changed. In offline mode the network is never used, which
+    together with put() lets tests run against a fixture corpus.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bodies (
+            hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            key TEXT NOT NULL,
+            revision INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            hash TEXT NOT NULL REFERENCES bodies (hash),
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (key, revision)
+        );
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, ttl=24 * 3600, offline=False,
+                 fetch_page=fetch_wikipedia_page, fetch_revision=fetch_wikipedia_revision):
+        self.ttl = ttl
+        self.offline = offline
+        self.fetch_page = fetch_page
+        self.fetch_revision = fetch_revision
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(self.SCHEMA)
+
+    def get(self, topic):
+        """Return the article for topic, from the store when it is fresh"""
+        key = normalize_title(topic)
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT pages.title, pages.revision, bodies.body, pages.fetched_at "
+                "FROM pages JOIN bodies ON bodies.hash = pages.hash "
+                "WHERE pages.key = ? ORDER BY pages.fetched_at DESC LIMIT 1", (key,)
+            ).fetchone()
+
+        if row:
+            title, revision, body, fetched_at = row
+            page = CachedPage(title, revision, zlib.decompress(body).decode('utf-8'))
+            if self.offline or time.time() - fetched_at < self.ttl:
+                return page
+            # Revalidate the stored article itself: topic may have been
+            # resolved to a different title when it was first fetched
+            if self.fetch_revision(title) == revision:
+                with self._lock, self.connection:
+                    self.connection.execute("UPDATE pages SET fetched_at = ? WHERE key = ? AND revision = ?",
+                                            (time.time(), key, revision))
+                return page
+        elif self.offline:
+            raise PageNotCached(topic)
+
+        page = self.fetch_page(topic)
+        self.put(topic, page)
+        return page
+
+    def put(self, topic, page):
+        """Store a page under the normalized topic title"""
+        body = page.content.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO bodies (hash, body) VALUES (?, ?)",
+                                    (digest, zlib.compress(body)))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages (key, revision, title, hash, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (normalize_title(topic), int(page.revision_id), page.title, digest, time.time())
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+class VocabularyStore:
+    """
+    Append-friendly on-disk vocabulary of word, POS category and source topic.
+
+    Rows live in a SQLite WITHOUT ROWID table whose primary key starts with
+    the word, so membership and prefix lookups are B-tree range scans and
+    memory use stays bounded however large the vocabulary grows. Adding a row
+    that is already present is a no-op, so runs can be appended freely.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS vocabulary (
+            word TEXT NOT NULL,
+            category TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            PRIMARY KEY (word, category, topic)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path='vocabulary.sqlite3'):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(self.SCHEMA)
+
+    def add(self, rows):
+        """Add (word, category, topic) rows"""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO vocabulary (word, category, topic) VALUES (?, ?, ?)", rows)
+
+    def add_topic(self, topic, word_categories):
+        """Add the category sets returned by extract_and_save_words for one topic"""
+        self.add((word, category, topic)
+                 for category, words in word_categories.items() for word in words)
+
+    def import_word_file(self, path, topic=None, category='unknown'):
+        """Import a words_<topic>_<timestamp>.txt file written by extract_and_save_words"""
+        if topic is None:
+            match = re.match(r'words_(.+)_\d{8}_\d{6}\.txt$', os.path.basename(path))
+            topic = match.group(1).replace('_', ' ') if match else os.path.basename(path)
+        with open(path, encoding='utf-8') as f:
+            self.add((line.strip(), category, topic) for line in f if line.strip())
+
+    def __contains__(self, word):
+        return self.connection.execute(
+            "SELECT 1 FROM vocabulary WHERE word = ? LIMIT 1", (word,)).fetchone() is not None
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(DISTINCT word) FROM vocabulary").fetchone()[0]
+
+    def lookup(self, word):
+        """Categories and source topics recorded for a word"""
+        rows = self.connection.execute(
+            "SELECT category, topic FROM vocabulary WHERE word = ?", (word,)).fetchall()
+        return {
+            'categories': {category for category, _ in rows},
+            'topics': {topic for _, topic in rows}
+        }
+
+    def with_prefix(self, prefix, limit=None):
+        """Yield distinct words starting with prefix, in sorted order"""
+        query = ("SELECT DISTINCT word FROM vocabulary WHERE word >= ? AND word < ? "
+                 "ORDER BY word LIMIT ?")
+        for (word,) in self.connection.execute(query, (prefix, prefix + '\U0010ffff',
+                                                       -1 if limit is None else limit)):
+            yield word
+
+    def words(self):
+        """Yield every distinct word in sorted order"""
+        for (word,) in self.connection.execute("SELECT DISTINCT word FROM vocabulary ORDER BY word"):
+            yield word
+
+    def close(self):
+        self.connection.close()
+
+
+_default_store = None
+
+
+def default_page_store():
+    """Page store shared by calls that don't pass their own"""
+    global _default_store
+    if _default_store is None:
+        _default_store = PageStore()
+    return _default_store
+
+
+def categorize_tagged_words(tagged_words, min_length=3):
+    """Yield (lowercased word, category) for each valid tagged word"""
+    for word, tag in tagged_words:
+        # Basic validation
+        if (len(word) >= min_length and
+                word.isalnum() and
+                word.isascii() and
+                not word.isnumeric()):
+
+            # Categorize for logging only
+            if tag.startswith('NN'):
+                category = 'nouns'
+            elif tag.startswith('VB'):
+                category = 'verbs'
+            elif tag.startswith('JJ'):
+                category = 'adjectives'
+            else:
+                category = 'others'
+            yield word.lower(), category
+
+
+def extract_and_save_words(topic, min_length=3, store=None, vocabulary=None):
+    import wikipedia
 
-def extract_and_save_words(topic, min_length=3):
     try:
-        # Fetch Wikipedia content
-        wiki_page = wikipedia.page(topic)
+        # Fetch Wikipedia content, from the local page store when possible
+        wiki_page = (store or default_page_store()).get(topic)
         text = wiki_page.content
 
         # Tokenize and tag parts of speech
+        word_tokenize, tagger = get_nltk_models()
         tokens = word_tokenize(text)
-        tagged_words = pos_tag(tokens)
+        tagged_words = tagger.tag(tokens)
 
         # Track categories for logging
         word_categories = {
@@ -30,25 +317,9 @@ def extract_and_save_words(topic, min_length=3):
         all_valid_words = set()
 
         # Process words
-        for word, tag in tagged_words:
-            # Basic validation
-            if (len(word) >= min_length and
-                    word.isalnum() and
-                    word.isascii() and
-                    not word.isnumeric()):
-
-                word = word.lower()
-                all_valid_words.add(word)
-
-                # Categorize for logging only
-                if tag.startswith('NN'):
-                    word_categories['nouns'].add(word)
-                elif tag.startswith('VB'):
-                    word_categories['verbs'].add(word)
-                elif tag.startswith('JJ'):
-                    word_categories['adjectives'].add(word)
-                else:
-                    word_categories['others'].add(word)
+        for word, category in categorize_tagged_words(tagged_words, min_length):
+            all_valid_words.add(word)
+            word_categories[category].add(word)
 
         # Save all words to file
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -58,15 +329,153 @@ def extract_and_save_words(topic, min_length=3):
             for word in sorted(all_valid_words):
                 f.write(word + '\n')
 
+        if vocabulary is not None:
+            vocabulary.add_topic(topic, word_categories)
+
         return filename, word_categories
 
     except wikipedia.exceptions.DisambiguationError as e:
         return None, f"Disambiguation Error: {e.options}"
     except wikipedia.exceptions.PageError:
         return None, "Error: Page not found"
+    except PageNotCached:
+        return None, "Error: Page not in the offline page store"
+
+
+def _text_chunks(text, chunk_chars):
+    """Split text on line breaks into blocks of roughly chunk_chars characters"""
+    chunk, size = [], 0
+    for line in text.splitlines(keepends=True):
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_chars:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _tag_text_chunk(text, min_length):
+    """Process pool worker: sentence-split, tokenize and tag a block of text"""
+    from nltk.tokenize import sent_tokenize
+    word_tokenize, tagger = get_nltk_models()
+    sentences = [word_tokenize(sentence, preserve_line=True) for sentence in sent_tokenize(text)]
+    return set(categorize_tagged_words(
+        (tagged for sentence in tagger.tag_sents(sentences) for tagged in sentence), min_length
+    ))
+
+
+def extract_words_batch(topics, min_length=3, store=None, output=None, processes=None,
+                        fetch_workers=4, chunk_chars=20000, vocabulary=None):
+    """
+    Extract words for many topics into one merged vocabulary file.
+
+    Articles are fetched by a thread pool while already fetched articles are
+    split into chunks and tagged sentence by sentence in a process pool, so
+    network and CPU work overlap. Words are streamed to a tab-separated
+    output file as word, category and topic lines, each once per topic, and
+    added to vocabulary (a VocabularyStore) when one is given.
+
+    Returns (output filename, per-topic category counts or error message,
+    topics extracted successfully per minute). A topic that fails to fetch or tag gets an error
+    message and the rest of the batch carries on; lines already written for
+    a topic whose tagging failed stay in the output.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    import wikipedia
+
+    # Each topic is fetched once; its bookkeeping is keyed by topic
+    topics = list(dict.fromkeys(topics))
+
+    store = store or default_page_store()
+    if output is None:
+        output = f"vocabulary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tsv"
+
+    started = time.perf_counter()
+    summary = {}
+    seen = {}
+    remaining_chunks = {}
+    tag_jobs = {}
+
+    def write_results(futures, f):
+        for future in futures:
+            topic = tag_jobs.pop(future)
+            try:
+                tagged = future.result()
+            except Exception as e:
+                summary[topic] = f"Error: tagging failed: {e}"
+            if isinstance(summary[topic], str):
+                # Tagging failed for this topic: drop the rest of its chunks
+                tagged = ()
+
+            new_rows = []
+            for word, category in tagged:
+                if (word, category) not in seen[topic]:
+                    seen[topic].add((word, category))
+                    summary[topic][category] += 1
+                    f.write(f"{word}\t{category}\t{topic}\n")
+                    new_rows.append((word, category, topic))
+            if vocabulary is not None and new_rows:
+                vocabulary.add(new_rows)
+            remaining_chunks[topic] -= 1
+            if not remaining_chunks[topic]:
+                # Topic finished, so its duplicate filter is no longer needed
+                del seen[topic]
+
+    with ThreadPoolExecutor(fetch_workers) as fetchers, \
+            ProcessPoolExecutor(processes) as taggers, \
+            open(output, 'w', encoding='utf-8') as f:
+        fetches = {fetchers.submit(store.get, topic): topic for topic in topics}
+
+        for fetched in as_completed(fetches):
+            topic = fetches[fetched]
+            try:
+                page = fetched.result()
+            except wikipedia.exceptions.DisambiguationError as e:
+                summary[topic] = f"Disambiguation Error: {e.options}"
+                continue
+            except wikipedia.exceptions.PageError:
+                summary[topic] = "Error: Page not found"
+                continue
+            except PageNotCached:
+                summary[topic] = "Error: Page not in the offline page store"
+                continue
+            except Exception as e:
+                # Connection errors, timeouts and the like only fail this topic
+                summary[topic] = f"Error: {type(e).__name__}: {e}"
+                continue
+
+            summary[topic] = {'nouns': 0, 'verbs': 0, 'adjectives': 0, 'others': 0}
+            seen[topic] = set()
+            remaining_chunks[topic] = 0
+            for chunk in _text_chunks(page.content, chunk_chars):
+                tag_jobs[taggers.submit(_tag_text_chunk, chunk, min_length)] = topic
+                remaining_chunks[topic] += 1
+
+            # Write whatever tagging has finished while fetching continues
+            write_results([future for future in tag_jobs if future.done()], f)
+
+        write_results(as_completed(list(tag_jobs)), f)
+
+    # Failed topics have an error string instead of counts and don't count as throughput
+    extracted = sum(isinstance(counts, dict) for counts in summary.values())
+    topics_per_minute = extracted / (time.perf_counter() - started) * 60
+    return output, summary, topics_per_minute
 
 
 if __name__ == "__main__":
+    # One-time setup: python words_extract.py setup
+    if sys.argv[1:] == ['setup']:
+        setup_nltk_resources()
+        sys.exit()
+
+    # Check startup cost: python words_extract.py import-time
+    if sys.argv[1:] == ['import-time']:
+        elapsed = measure_import_time()
+        status = "within" if elapsed <= IMPORT_TIME_BUDGET_MS else "over"
+        print(f"Import time: {elapsed:.1f} ms ({status} the {IMPORT_TIME_BUDGET_MS} ms budget)")
+        sys.exit(elapsed > IMPORT_TIME_BUDGET_MS)
+
     topic = "Ocean"
     filename, categories = extract_and_save_words(topic)
 